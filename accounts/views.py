@@ -15,6 +15,7 @@ class UserListView(mixins.HybridListView):
     model = User
     table_class = tables.UserTable
     filterset_fields = ("is_active", "is_staff")
+    count_scope = "*"
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -0,0 +1,98 @@
+import os
+from functools import lru_cache
+
+import sib_api_v3_sdk
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from sib_api_v3_sdk.rest import ApiException
+
+
+# Recipients sent in one API call, as message versions of a single e-mail
+BROADCAST_BATCH_SIZE = 100
+SENDER_NAME = "Jamia Admin ERP"
+
+
+@lru_cache(maxsize=8)
+def _get_transactional_api(pid, host, api_key):
+    configuration = sib_api_v3_sdk.Configuration()
+    if host:
+        configuration.host = host
+    configuration.api_key["api-key"] = api_key
+    return sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
+
+
+def get_transactional_api():
+    """
+    Brevo transactional e-mails API client of this process.
+
+    The client is built once and its connection pool keeps the connections to Brevo open between sends. A forked
+    process builds its own, as pooled connections can't be shared between processes.
+    """
+    return _get_transactional_api(os.getpid(), getattr(settings, "BREVO_API_URL", None), getattr(settings, "BREVO_API_KEY", None))
+
+
+def get_sender():
+    return {"email": settings.DEFAULT_FROM_EMAIL, "name": SENDER_NAME}
+
+
+def normalize_recipients(recipients):
+    """``{email: params}`` of ``recipients`` given as addresses or ``(email, params)`` pairs, each address once."""
+    normalized = {}
+    for recipient in recipients:
+        email, params = (recipient, None) if isinstance(recipient, str) else recipient
+        normalized.setdefault(email.strip(), params or None)
+    return normalized
+
+
+def is_permanent_error(error):
+    """Whether sending again can't fix ``error``: an invalid address, or a recipient Brevo refused (400)."""
+    return isinstance(error, ValidationError) or (isinstance(error, ApiException) and error.status == 400)
+
+
+def send_batch(api, batch, subject, html_content):
+    """
+    Send ``batch`` (``[(email, params)]``) in one API call and return ``{email: error or None}``.
+
+    Brevo rejects the whole call when one of its recipients is refused, so a rejected batch is split in halves until
+    the refused recipients are found and the others are sent.
+    """
+    message = sib_api_v3_sdk.SendSmtpEmail(
+        sender=get_sender(),
+        subject=subject,
+        html_content=html_content,
+        message_versions=[sib_api_v3_sdk.SendSmtpEmailMessageVersions(to=[{"email": email}], params=params) for email, params in batch],
+    )
+    try:
+        api.send_transac_email(message)
+    except ApiException as error:
+        if error.status == 400 and len(batch) > 1:
+            middle = len(batch) // 2
+            return {**send_batch(api, batch[:middle], subject, html_content), **send_batch(api, batch[middle:], subject, html_content)}
+        return {email: error for email, _ in batch}
+    except Exception as error:
+        return {email: error for email, _ in batch}
+    return {email: None for email, _ in batch}
+
+
+def send_broadcast(recipients, subject, html_content, batch_size=BROADCAST_BATCH_SIZE):
+    """
+    Send the same e-mail to ``recipients`` with one Brevo API call per ``batch_size`` of them.
+
+    Recipients are addresses or ``(email, params)`` pairs, the params of each recipient fill the ``{{ params.<name> }}``
+    placeholders of ``html_content``. Returns ``{email: error or None}``: the exception that kept each address from
+    being sent, None for the sent ones.
+    """
+    results, valid = {}, []
+    for email, params in normalize_recipients(recipients).items():
+        try:
+            validate_email(email)
+        except ValidationError as error:
+            results[email] = error
+        else:
+            valid.append((email, params))
+
+    api = get_transactional_api()
+    for start in range(0, len(valid), batch_size):
+        results.update(send_batch(api, valid[start : start + batch_size], subject, html_content))
+    return results
@@ -0,0 +1,136 @@
+import hashlib
+import uuid
+from datetime import date
+from datetime import datetime
+from datetime import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import QuerySet
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def count_by(queryset, **conditions):
+    """
+    Evaluate several counters over ``queryset`` in a single aggregate query.
+
+    Each keyword maps a result key to a ``Q`` object, and an empty ``Q()`` counts every row.
+    """
+    if not conditions:
+        return {}
+    return queryset.aggregate(**{key: Count("pk", filter=condition) for key, condition in conditions.items()})
+
+
+MONTHLY_WINDOWS = (6, 12, 24)
+
+
+def get_month_starts(months):
+    """Return the first day of the last ``months`` calendar months, oldest first, ending with the current month."""
+    today = timezone.localdate()
+    year, month = today.year, today.month
+    month_starts = []
+    for _ in range(months):
+        month_starts.append(date(year, month, 1))
+        year, month = (year - 1, 12) if month == 1 else (year, month - 1)
+    return list(reversed(month_starts))
+
+
+def monthly_series(queryset, date_field="created", months=6, value=None):
+    """
+    Count the rows of ``queryset`` per calendar month with a single GROUP BY query.
+
+    ``value`` replaces the row count with another aggregate, e.g. ``Sum("opened")`` over pre-aggregated rows.
+    Months without rows are filled with zero, so charts always get ``months`` consecutive points.
+    """
+    month_starts = get_month_starts(months)
+    since = timezone.make_aware(datetime.combine(month_starts[0], time.min))
+    rows = (
+        queryset.filter(**{f"{date_field}__gte": since})
+        .annotate(month=TruncMonth(date_field))
+        .values("month")
+        .annotate(count=value or Count("pk", distinct=True))
+        .order_by()
+    )
+    counts = {(row["month"].year, row["month"].month): row["count"] or 0 for row in rows}
+    return [{"month": month_start.strftime("%b %Y"), "count": counts.get((month_start.year, month_start.month), 0)} for month_start in month_starts]
+
+
+SUPERUSER_SCOPE = "superuser"
+GLOBAL_SCOPE = "*"
+
+
+def get_dashboard_scope(user):
+    return SUPERUSER_SCOPE if user.is_superuser else (user.usertype or "")
+
+
+def get_dashboard_versions(*scopes):
+    """Return the current version token of each scope, creating a fresh token for scopes that have none."""
+    keys = {scope: f"dashboard:version:{scope}" for scope in scopes}
+    versions = cache.get_many(keys.values())
+    tokens = []
+    for scope, key in keys.items():
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+        tokens.append(versions[key])
+    return tokens
+
+
+def bump_dashboard_version(*scopes):
+    """Invalidate the cached dashboards of the given usertype scopes once the current transaction commits."""
+    keys = [f"dashboard:version:{scope}" for scope in set(scopes) if scope is not None]
+    transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, None))
+
+
+def get_request_scopes(submission, *usertypes):
+    """Usertype scopes whose dashboards show ``submission``: its flow, the given usertypes and the staff who see every request."""
+    return {*usertypes, *(submission.usertype_flow or []), submission.current_usertype, "OE", "director", SUPERUSER_SCOPE}
+
+
+# Cache policy of each dashboard widget: how long a snapshot lives and which version scopes invalidate it.
+# Widgets without "timeout" live for settings.DASHBOARD_CACHE_TIMEOUT seconds, widgets without "scopes" follow the
+# usertype scope of the viewer and the global scope.
+DASHBOARD_WIDGETS = {
+    "counters": {"timeout": 60},
+    "recent_assigned": {"timeout": 60},
+    "recent_changes": {"timeout": 120},
+    "status_distribution": {},
+    "stage_dwell": {"timeout": 900},
+    "monthly": {"timeout": 900},
+    "usertype_distribution": {"timeout": 900, "scopes": (GLOBAL_SCOPE,)},
+}
+
+
+def get_dashboard_role(user):
+    """Name of the dashboard layout shown to ``user``: superuser, oe, college or user."""
+    if user.is_superuser or user.usertype == "director":
+        return "superuser"
+    return {"OE": "oe", "College": "college"}.get(user.usertype, "user")
+
+
+def get_dashboard_snapshot(request, widget, build):
+    """
+    Return the data of one dashboard ``widget`` for ``request.user`` from the cache, calling ``build()`` on a miss.
+
+    Snapshots are keyed by widget, user, usertype, query string and the version tokens of the widget's scopes,
+    so bumping a version makes every snapshot of that scope stale. The widget's ``timeout`` (``DASHBOARD_CACHE_TIMEOUT``
+    for widgets without one) bounds their lifetime and ``DASHBOARD_CACHE_ENABLED = False`` bypasses the cache.
+    """
+    if not getattr(settings, "DASHBOARD_CACHE_ENABLED", True):
+        return build()
+
+    user = request.user
+    scope = get_dashboard_scope(user)
+    policy = DASHBOARD_WIDGETS.get(widget, {})
+    versions = get_dashboard_versions(*policy.get("scopes", (GLOBAL_SCOPE, scope)))
+    params = hashlib.md5(request.GET.urlencode().encode()).hexdigest()
+    key = f"dashboard:snapshot:{widget}:{user.pk}:{scope}:{params}:{':'.join(versions)}"
+
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = {name: list(value) if isinstance(value, QuerySet) else value for name, value in build().items()}
+        cache.set(key, snapshot, policy.get("timeout", getattr(settings, "DASHBOARD_CACHE_TIMEOUT", 300)))
+    return snapshot
@@ -0,0 +1,15 @@
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend whose transactions take the write lock when they begin.
+
+    A deferred transaction (plain ``BEGIN``) that reads before it writes can't wait for another writer: SQLite fails it
+    at once with "database is locked" rather than risk a deadlock. The full-text search triggers read their config
+    before every write, so concurrent request creates and status updates failed that way. ``BEGIN IMMEDIATE`` waits
+    for the other writers up to the ``timeout`` option instead.
+    """
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
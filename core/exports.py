@@ -0,0 +1,59 @@
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils.encoding import force_str
+from django_tables2.export import TableExport
+from django_tables2.rows import BoundRow
+
+from .paginators import get_table_queryset
+
+
+# Rows fetched from the database per round trip while exporting
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object handing back what is written to it, so ``csv.writer`` output can be yielded line by line."""
+
+    def write(self, value):
+        return value
+
+
+def get_export_columns(table, exclude_columns=None):
+    return [column for column in table.columns.iterall() if not (column.column.exclude_from_export or column.name in (exclude_columns or ()))]
+
+
+def iter_table_values(table, exclude_columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Like ``Table.as_values()``, but reading a queryset backed table with ``iterator()``, so only ``chunk_size`` records
+    are held in memory at a time instead of the whole result.
+    """
+    columns = get_export_columns(table, exclude_columns)
+    yield [force_str(column.header, strings_only=True) for column in columns]
+
+    queryset = get_table_queryset(table)
+    records = queryset.iterator(chunk_size=chunk_size) if queryset is not None else table.data
+    for record in records:
+        row = BoundRow(record, table=table)
+        yield [force_str(row.get_cell_value(column.name), strings_only=True) for column in columns]
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_table_export(table, export_format, filename, exclude_columns=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Response exporting every row of ``table`` as CSV, generated while it is sent, without loading the rows in memory.
+
+    Only CSV can be streamed: an XLSX file is a zip archive that is only complete once every row is written, so XLSX
+    and the other formats go through ``TableExport``, which builds the whole table in memory.
+    """
+    if export_format != TableExport.CSV:
+        raise ValueError(f'Streaming export format "{export_format}" is not supported.')
+    rows = iter_table_values(table, exclude_columns=exclude_columns, chunk_size=chunk_size)
+    response = StreamingHttpResponse(stream_csv(rows), content_type=TableExport.FORMATS[TableExport.CSV])
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
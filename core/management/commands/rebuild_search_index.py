@@ -0,0 +1,21 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from core.search import SEARCH_DOCUMENTS
+from core.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search entries of request submissions and user profiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument("models", nargs="*", help=f"Only rebuild these models ({', '.join(SEARCH_DOCUMENTS)}).")
+
+    def handle(self, *args, **options):
+        labels = [label.lower() for label in options["models"]]
+        unknown = set(labels) - set(SEARCH_DOCUMENTS)
+        if unknown:
+            raise CommandError(f"Not searchable: {', '.join(sorted(unknown))}.")
+        indexed = rebuild_search_index(*(apps.get_model(label) for label in labels))
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} changed or new search entries."))
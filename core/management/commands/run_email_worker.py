@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core.outbox import drain_outbox
+from core.outbox import get_transport
+
+
+class Command(BaseCommand):
+    help = "Send the e-mails queued in the outbox, retrying failed ones with backoff until they are sent or dead."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="E-mails sent at the same time (default 4).")
+        parser.add_argument("--batch-size", type=int, default=100, help="E-mails claimed from the outbox at a time (default 100).")
+        parser.add_argument("--interval", type=float, default=5, help="Seconds between two looks at an empty outbox (default 5).")
+        parser.add_argument("--once", action="store_true", help="Send the due e-mails and exit.")
+
+    def handle(self, *args, **options):
+        transport = get_transport()
+        try:
+            while True:
+                close_old_connections()
+                counts = drain_outbox(transport, workers=options["workers"], batch_size=options["batch_size"])
+                if counts:
+                    self.stdout.write(f"Sent {counts['sent']}, retrying {counts['retried']}, dead {counts['dead']}.")
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopped.")
@@ -0,0 +1,122 @@
+# Generated by Django 4.2 on 2026-10-18 08:17
+
+import html
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils.html import strip_tags
+
+
+SQLITE_SQL = [
+    "CREATE VIRTUAL TABLE core_searchentry_fts USING fts5(title, body, content='core_searchentry', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    """CREATE TRIGGER core_searchentry_fts_insert AFTER INSERT ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+    """CREATE TRIGGER core_searchentry_fts_delete AFTER DELETE ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END""",
+    """CREATE TRIGGER core_searchentry_fts_update AFTER UPDATE OF title, body ON core_searchentry BEGIN
+        INSERT INTO core_searchentry_fts(core_searchentry_fts, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO core_searchentry_fts(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END""",
+]
+SQLITE_REVERSE_SQL = [
+    "DROP TRIGGER IF EXISTS core_searchentry_fts_update",
+    "DROP TRIGGER IF EXISTS core_searchentry_fts_delete",
+    "DROP TRIGGER IF EXISTS core_searchentry_fts_insert",
+    "DROP TABLE IF EXISTS core_searchentry_fts",
+]
+POSTGRESQL_SQL = [
+    """CREATE FUNCTION core_searchentry_document() RETURNS trigger AS $$
+    BEGIN
+        NEW.document := setweight(to_tsvector('simple', coalesce(NEW.title, '')), 'A') || setweight(to_tsvector('simple', coalesce(NEW.body, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql""",
+    "CREATE TRIGGER core_searchentry_document BEFORE INSERT OR UPDATE OF title, body ON core_searchentry FOR EACH ROW EXECUTE FUNCTION core_searchentry_document()",
+    "CREATE INDEX core_searchentry_document_idx ON core_searchentry USING gin (document)",
+]
+POSTGRESQL_REVERSE_SQL = [
+    "DROP INDEX IF EXISTS core_searchentry_document_idx",
+    "DROP TRIGGER IF EXISTS core_searchentry_document ON core_searchentry",
+    "DROP FUNCTION IF EXISTS core_searchentry_document()",
+]
+
+
+def run_vendor_sql(sql):
+    def run(apps, schema_editor):
+        for statement in sql.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+def plain_text(value):
+    return html.unescape(strip_tags(value or "")).strip()
+
+
+def join_text(*values):
+    return " ".join(str(value) for value in values if value)
+
+
+def backfill_search_entries(apps, schema_editor):
+    ContentType = apps.get_model("contenttypes", "ContentType")
+    SearchEntry = apps.get_model("core", "SearchEntry")
+    RequestSubmission = apps.get_model("masters", "RequestSubmission")
+    UserProfile = apps.get_model("users", "UserProfile")
+
+    entries = []
+    content_type = ContentType.objects.get_or_create(app_label="masters", model="requestsubmission")[0]
+    remarks = {}
+    for submission_id, remark in apps.get_model("masters", "RequestSubmissionStatusHistory").objects.exclude(remark=None).values_list("submission_id", "remark").order_by("-date"):
+        remarks.setdefault(submission_id, []).append(plain_text(remark))
+    for submission in RequestSubmission.objects.select_related("title", "college").iterator(chunk_size=500):
+        college = join_text(submission.college.first_name, submission.college.last_name)
+        title = join_text(submission.request_id, submission.title.title if submission.title else None, college)
+        body = join_text(plain_text(submission.description), plain_text(submission.alternative_description), *remarks.get(submission.pk, []))
+        entries.append(SearchEntry(content_type=content_type, object_id=submission.pk, title=title, body=body))
+
+    content_type = ContentType.objects.get_or_create(app_label="users", model="userprofile")[0]
+    for profile in UserProfile.objects.select_related("user").iterator(chunk_size=500):
+        title = join_text(profile.first_name, profile.last_name, profile.profile_id)
+        body = join_text(profile.email, profile.user.email if profile.user else None, profile.mobile, profile.whatsapp)
+        entries.append(SearchEntry(content_type=content_type, object_id=profile.pk, title=title, body=body))
+    SearchEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0001_initial'),
+        ('masters', '0018_requestassignment'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('title', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+                ('document', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('content_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype')),
+            ],
+            options={
+                'verbose_name_plural': 'Search Entries',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchentry',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='search_entry_unique_object'),
+        ),
+        migrations.RunPython(
+            run_vendor_sql({"sqlite": SQLITE_SQL, "postgresql": POSTGRESQL_SQL}),
+            run_vendor_sql({"sqlite": SQLITE_REVERSE_SQL, "postgresql": POSTGRESQL_REVERSE_SQL}),
+        ),
+        migrations.RunPython(backfill_search_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2 on 2026-10-18 08:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_searchentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=20)),
+                ('year', models.PositiveSmallIntegerField(default=0)),
+                ('last_number', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='documentsequence',
+            constraint=models.UniqueConstraint(fields=('prefix', 'year'), name='document_sequence_unique_prefix_year'),
+        ),
+    ]
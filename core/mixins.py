@@ -1,3 +1,4 @@
+import hashlib
 import operator
 import re
 from functools import reduce
@@ -11,6 +12,8 @@ from django.db.models import ForeignKey
 from django.db.models import ManyToManyField
 from django.db.models import OneToOneField
 from django.db.models import Q
+from django.db.models import QuerySet
+from django.db.models.query import ModelIterable
 from django.db.models import CharField
 from django.db.models import TextField
 from django.forms import ModelChoiceField
@@ -20,6 +23,7 @@ from django.forms.models import model_to_dict
 from django.http import JsonResponse
 from django.shortcuts import redirect
 from django.urls import NoReverseMatch
+from django.utils.http import urlencode
 from django.urls import reverse_lazy
 from django.views.generic import DetailView
 from django.views.generic import View
@@ -38,6 +42,16 @@ from django_filters import FilterSet
 from django_filters import ModelChoiceFilter
 from django_filters import ModelMultipleChoiceFilter
 
+from .exports import EXPORT_CHUNK_SIZE
+from .exports import stream_table_export
+from .paginators import CachedCountPaginator
+from .paginators import KeysetPaginator
+from .paginators import get_count_versions
+from .related import plan_related_lookups
+from .search import is_searchable
+from .search import search
+
+
 def convert_to_spaces(text):
     result = re.sub(r"([a-z])([A-Z])", r"\1 \2", text)
     return result
@@ -204,6 +218,19 @@ class HybridDeleteView(CustomLoginRequiredMixin, DeleteView,):
 class HybridListView(CustomLoginRequiredMixin, ExportMixin, SingleTableMixin, FilterView, ListView):
     template_name = "app/common/object_list.html"
     table_pagination = {"per_page": 50}
+    max_per_page = 100
+    # Page with ?cursor= links instead of page numbers: no COUNT(*) and no OFFSET, see KeysetPaginator
+    keyset_pagination = False
+    # Models whose changes invalidate the cached row count, defaults to the list model
+    count_cache_models = ()
+    # Users sharing a cached row count, defaults to one count per user; "*" when the queryset does not depend on the user
+    count_scope = None
+    # Relations loaded with the table rows, planned from the table columns when None (see core.related)
+    list_select_related = None
+    list_prefetch_related = None
+    # Export formats written row by row from a queryset iterator, the others (XLSX included) go through tablib in memory
+    streaming_export_formats = ("csv",)
+    export_chunk_size = EXPORT_CHUNK_SIZE
     search_fields = []  # Set dynamically
     
     def setup_search_fields(self):
@@ -220,18 +247,77 @@ class HybridListView(CustomLoginRequiredMixin, ExportMixin, SingleTableMixin, Fi
         # Update table_pagination based on query params
         per_page = request.GET.get("table_pagination")
         if per_page and per_page.isdigit():
-            self.table_pagination = {"per_page": int(per_page)}
+            self.table_pagination = {"per_page": min(max(int(per_page), 1), self.max_per_page)}
         return super().get(request, *args, **kwargs)
 
+    def get_table_pagination(self, table):
+        paginate = super().get_table_pagination(table)
+        if paginate is False or self.is_export_request():
+            # Exports hold every row, counting and fetching a page first would be wasted
+            return False
+        if self.keyset_pagination:
+            return dict(paginate, paginator_class=KeysetPaginator, cursor=self.request.GET.get("cursor"), max_per_page=self.max_per_page)
+        list_params = self.get_list_params()
+        # Planner estimates are only close enough on unfiltered lists
+        return dict(paginate, paginator_class=CachedCountPaginator, count_cache_key=self.get_count_cache_key(list_params), estimate_count=not list_params)
+
+    def is_export_request(self):
+        return self.export_class.is_valid_format(self.request.GET.get(self.export_trigger_param))
+
+    def create_export(self, export_format):
+        if export_format not in self.streaming_export_formats:
+            return super().create_export(export_format)
+        return stream_table_export(
+            self.get_table(**self.get_table_kwargs()),
+            export_format,
+            self.get_export_filename(export_format),
+            exclude_columns=self.exclude_columns,
+            chunk_size=self.export_chunk_size,
+        )
+
+    def get_related_lookups(self):
+        select_related, prefetch_related = self.list_select_related, self.list_prefetch_related
+        if select_related is None or prefetch_related is None:
+            planned = plan_related_lookups(self.model, self.get_table_class())
+            select_related = planned[0] if select_related is None else select_related
+            prefetch_related = planned[1] if prefetch_related is None else prefetch_related
+        return select_related, prefetch_related
+
+    def get_table_data(self):
+        data = super().get_table_data()
+        if isinstance(data, QuerySet) and issubclass(data._iterable_class, ModelIterable):
+            select_related, prefetch_related = self.get_related_lookups()
+            if select_related:
+                data = data.select_related(*select_related)
+            if prefetch_related:
+                data = data.prefetch_related(*prefetch_related)
+        return data
+
+    def get_list_params(self):
+        """Query parameters that change which rows are listed, i.e. without the paging, sorting and export ones."""
+        params = self.request.GET.copy()
+        for name in ("page", "per_page", "table_pagination", "sort", "cursor", self.export_trigger_param):
+            params.pop(name, None)
+        return sorted((name, values) for name, values in params.lists() if any(values))
+
+    def get_count_cache_key(self, list_params):
+        versions = get_count_versions(*(self.count_cache_models or (self.model,)))
+        params = hashlib.md5(urlencode(list_params, doseq=True).encode()).hexdigest()
+        return f"list_count:{self.__class__.__module__}.{self.__class__.__name__}:{self.count_scope or self.request.user.pk}:{params}:{':'.join(versions)}"
+
     def get_queryset(self):
         queryset = super().get_queryset()
         user = self.request.user
 
-        self.setup_search_fields()
-        search_fields = getattr(self, "search_fields", None)
-        if search_fields:
-            query = self.request.GET.get("q")
-            if query:
+        query = self.request.GET.get("q")
+        if query and is_searchable(self.model):
+            # Best matches first, unless the table is sorted by a column
+            ordering = queryset.query.order_by or self.model._meta.ordering
+            queryset = search(queryset, query).order_by("-search_rank", *ordering)
+        elif query:
+            self.setup_search_fields()
+            search_fields = getattr(self, "search_fields", None)
+            if search_fields:
                 q_list = [Q(**{f"{field}__icontains": query}) for field in search_fields]
                 queryset = queryset.filter(reduce(operator.or_, q_list))
 
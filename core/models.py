@@ -4,8 +4,12 @@ from core.choices import VIEW_TYPE_CHOICES
 from core.choices import YEAR_CHOICES
 
 from .base import BaseModel
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.conf import settings
 
 
@@ -38,6 +42,10 @@ def get_default_document_settings():
         "receipt": {"prefix": "RCPT", "start_count": 1},
         "payment": {"prefix": "PY", "start_count": 1},
         "jv": {"prefix": "JV", "start_count": 1},
+        "request": {"prefix": "REQ", "start_count": 1},
+        # Profile ids have always been plain numbers ("0042") and are shown as such, so their counter row is named
+        # by "sequence" instead of the empty prefix
+        "profile": {"prefix": "", "sequence": "profile", "start_count": 1},
     }
 
 
@@ -96,5 +104,88 @@ class Notification(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Relations read by __str__, joined by the lists that render notifications (see core.related)
+    str_select_related = ("user",)
+
+    def __str__(self):
+        return f"Notification for {self.user}: {self.message}"
+
+
+class SearchEntry(models.Model):
+    """
+    Searchable text of one object, see ``core.search``.
+
+    ``title`` holds the identifying text (ids, titles, names) and ranks above ``body``. The database keeps the
+    full-text index in sync with triggers: an FTS5 table on SQLite and the weighted ``document`` on PostgreSQL.
+    """
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    content_object = GenericForeignKey("content_type", "object_id")
+    title = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    document = SearchVectorField(null=True, editable=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Search Entries"
+        constraints = [models.UniqueConstraint(fields=["content_type", "object_id"], name="search_entry_unique_object")]
+
+    def __str__(self):
+        return self.title
+
+
+class DocumentSequence(models.Model):
+    """
+    Last number handed out with a document prefix, see ``core.sequences``.
+
+    Yearly sequences keep one row per year and restart every year, the others use year 0.
+    """
+
+    prefix = models.CharField(max_length=20)
+    year = models.PositiveSmallIntegerField(default=0)
+    last_number = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["prefix", "year"], name="document_sequence_unique_prefix_year")]
+
+    def __str__(self):
+        return f"{self.prefix}{self.year or ''}: {self.last_number}"
+
+
+class EmailOutbox(models.Model):
+    """
+    E-mail waiting to be sent by the ``run_email_worker`` command, see ``core.outbox``.
+
+    Rows are added in the transaction of the change they announce, so only committed changes are e-mailed and a
+    slow or failing mail provider never holds up a request.
+    """
+
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+    STATUS_CHOICES = ((PENDING, "Pending"), (SENDING, "Sending"), (SENT, "Sent"), (DEAD, "Dead"))
+
+    to_email = models.EmailField(max_length=254)
+    subject = models.CharField(max_length=255)
+    html_content = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    # Worker run holding the e-mail while sending it, until claimed_until
+    claim = models.UUIDField(null=True, blank=True, editable=False)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Email Outbox"
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="email_outbox_due_idx"),
+            models.Index(fields=["claim"], name="email_outbox_claim_idx"),
+        ]
+
     def __str__(self):
-        return f"Notification for {self.user}: {self.message}"
\ No newline at end of file
+        return f"{self.subject} to {self.to_email}"
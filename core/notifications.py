@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.db import transaction
+
+from .dashboard import bump_dashboard_version
+from .dashboard import get_dashboard_scope
+from .models import Notification
+from .outbox import queue_emails
+from .paginators import bump_count_version
+from .utils import get_memo_notification_email_html
+from .utils import get_notification_email_html
+
+
+NOTIFICATION_KIND = "notification"
+MEMO_KIND = "memo"
+
+
+def get_notification_domain(request=None):
+    """Domain notification e-mails link to: the one of ``request``, else the current site, else ``DEFAULT_DOMAIN``."""
+    if request is not None:
+        return f"{request.scheme}://{request.get_host()}"
+    try:
+        return f"https://{Site.objects.get_current().domain}"
+    except Exception:
+        return getattr(settings, "DEFAULT_DOMAIN", "http://localhost:8000")
+
+
+def get_notification_email(notification, kind=NOTIFICATION_KIND, extra=None, domain=None):
+    """``(subject, html)`` of the e-mail of ``notification``, ``extra`` holds the details of its ``kind``."""
+    extra = extra or {}
+    if kind == MEMO_KIND:
+        html_content = get_memo_notification_email_html(
+            memo_title=extra.get("title", notification.message),
+            memo_description=extra.get("description") or "A new memo has been published and is now available for viewing.",
+            url=notification.url,
+            domain=domain,
+        )
+        return "New Memo Published - Jamia Admin ERP", html_content
+    return "New Notification from Jamia Admin ERP", get_notification_email_html(notification.message, notification.url, domain=domain)
+
+
+def queue_notification_emails(notifications, kind=NOTIFICATION_KIND, extra=None, domain=None):
+    queue_emails(
+        (notification.user.email, *get_notification_email(notification, kind, extra, domain)) for notification in notifications if notification.user.email
+    )
+
+
+# Called with the stored notifications, their kind, extra and domain in the transaction creating them. Deliveries are
+# queued (see core.outbox), so nothing leaves the application before that transaction commits.
+NOTIFICATION_DISPATCHERS = [queue_notification_emails]
+
+
+def dispatch_notifications(notifications, kind=NOTIFICATION_KIND, extra=None, domain=None):
+    for dispatcher in NOTIFICATION_DISPATCHERS:
+        dispatcher(notifications, kind=kind, extra=extra, domain=domain)
+
+
+def create_notifications(notifications, kind=NOTIFICATION_KIND, extra=None, request=None):
+    """
+    Store the unsaved ``notifications`` in one INSERT and queue their deliveries in the same transaction.
+
+    ``bulk_create`` sends no ``post_save``, so the dashboards and list counts the notification signals would invalidate
+    are invalidated here.
+    """
+    if not notifications:
+        return []
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(notifications, batch_size=500)
+        dispatch_notifications(notifications, kind=kind, extra=extra, domain=get_notification_domain(request))
+
+    bump_dashboard_version(*{get_dashboard_scope(notification.user) for notification in notifications})
+    bump_count_version(Notification)
+    return notifications
+
+
+def notify(users, message, url, kind=NOTIFICATION_KIND, extra=None, request=None):
+    """
+    Notify each of ``users`` once with ``message`` and a link to ``url``, see ``create_notifications``.
+
+    Missing users (e.g. profiles without an account) are skipped.
+    """
+    recipients = {user.pk: user for user in users if user is not None}
+    return create_notifications([Notification(user=user, message=message, url=str(url)) for user in recipients.values()], kind, extra, request)
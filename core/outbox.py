@@ -0,0 +1,198 @@
+import random
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import sib_api_v3_sdk
+from django.conf import settings
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import Q
+from django.db.models import Value
+from django.db.models import When
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from sib_api_v3_sdk.rest import ApiException
+
+from .brevo import BROADCAST_BATCH_SIZE
+from .brevo import get_sender
+from .brevo import get_transactional_api
+from .brevo import is_permanent_error
+from .brevo import send_broadcast
+from .models import EmailOutbox
+
+
+# How long a worker may hold claimed e-mails before another worker takes them over
+CLAIM_TIMEOUT = timedelta(minutes=5)
+# Longest wait between two attempts of an e-mail
+MAX_RETRY_DELAY = timedelta(hours=6)
+
+
+def queue_emails(messages):
+    """Add ``(to_email, subject, html_content)`` messages to the outbox, in the current transaction."""
+    return EmailOutbox.objects.bulk_create(
+        [EmailOutbox(to_email=to_email, subject=subject, html_content=html_content) for to_email, subject, html_content in messages], batch_size=500
+    )
+
+
+def queue_email(to_email, subject, html_content):
+    return queue_emails([(to_email, subject, html_content)])[0]
+
+
+class PermanentEmailError(Exception):
+    """Failure of a transport that sending again can't fix, e.g. an invalid address: the e-mail is dead at once."""
+
+
+class BrevoTransport:
+    """
+    Sends outbox e-mails through the Brevo transactional API with the pooled client of the process, raising on failures
+    so they are retried, or ``PermanentEmailError`` for invalid and refused recipients. E-mails with the same subject
+    and content go out together, one API call per batch.
+    """
+
+    def __init__(self):
+        self.api = get_transactional_api()
+
+    @staticmethod
+    def get_error(error):
+        if error is not None and is_permanent_error(error):
+            return PermanentEmailError(f"{type(error).__name__}: {error}")
+        return error
+
+    def send(self, email):
+        try:
+            self.api.send_transac_email(
+                sib_api_v3_sdk.SendSmtpEmail(to=[{"email": email.to_email}], sender=get_sender(), subject=email.subject, html_content=email.html_content)
+            )
+        except ApiException as error:
+            if is_permanent_error(error):
+                raise self.get_error(error) from error
+            raise
+
+    def send_many(self, emails):
+        """Errors of sending ``emails``, which share their subject and content, in order (None for the sent ones)."""
+        results = send_broadcast([email.to_email for email in emails], emails[0].subject, emails[0].html_content)
+        return [self.get_error(results[email.to_email.strip()]) for email in emails]
+
+
+def get_transport():
+    return import_string(settings.EMAIL_OUTBOX_TRANSPORT)()
+
+
+def get_retry_delay(attempts, retry_delay=None):
+    """Wait before the attempt after ``attempts`` failed ones: doubling from ``retry_delay`` seconds, with some jitter."""
+    retry_delay = settings.EMAIL_OUTBOX_RETRY_DELAY if retry_delay is None else retry_delay
+    delay = min(timedelta(seconds=retry_delay * 2 ** (attempts - 1)), MAX_RETRY_DELAY)
+    # Spread retries of e-mails that failed together, e.g. during a provider outage
+    return delay * random.uniform(1, 1.1)
+
+
+def claim_emails(limit):
+    """
+    Claim up to ``limit`` due e-mails for this worker and count the attempt.
+
+    The claim is a conditional UPDATE, so concurrent workers never claim the same e-mail. E-mails of a worker that
+    stopped while sending are due again once their claim times out.
+    """
+    now = timezone.now()
+    due = EmailOutbox.objects.filter(Q(status=EmailOutbox.PENDING, next_attempt_at__lte=now) | Q(status=EmailOutbox.SENDING, claimed_until__lte=now))
+    pks = list(due.order_by("next_attempt_at", "pk").values_list("pk", flat=True)[:limit])
+    if not pks:
+        return []
+    claim = uuid.uuid4()
+    due.filter(pk__in=pks).update(status=EmailOutbox.SENDING, claim=claim, claimed_until=now + CLAIM_TIMEOUT, attempts=F("attempts") + 1)
+    return list(EmailOutbox.objects.filter(claim=claim).order_by("next_attempt_at", "pk"))
+
+
+def send_email(transport, email):
+    """Error of sending ``email`` with ``transport``, or None once it is sent."""
+    try:
+        transport.send(email)
+    except Exception as error:
+        return error
+    return None
+
+
+def send_emails(transport, emails):
+    """Errors of sending ``emails`` with ``transport`` in order, None for the sent ones."""
+    if len(emails) == 1 or not hasattr(transport, "send_many"):
+        return [send_email(transport, email) for email in emails]
+    try:
+        return transport.send_many(emails)
+    except Exception as error:
+        return [error] * len(emails)
+
+
+def group_emails(transport, emails):
+    """
+    E-mails sent together: up to ``BROADCAST_BATCH_SIZE`` with the same subject and content for transports sending many,
+    else one by one.
+    """
+    if not hasattr(transport, "send_many"):
+        return [[email] for email in emails]
+    groups = {}
+    for email in emails:
+        groups.setdefault((email.subject, email.html_content), []).append(email)
+    return [group[start : start + BROADCAST_BATCH_SIZE] for group in groups.values() for start in range(0, len(group), BROADCAST_BATCH_SIZE)]
+
+
+def get_per_email_value(values, field):
+    """Expression giving each e-mail its value in ``values`` (``{pk: value}``) for ``field`` in an UPDATE."""
+    return Case(*(When(pk=pk, then=Value(value)) for pk, value in values.items()), output_field=EmailOutbox._meta.get_field(field))
+
+
+def record_results(emails, errors, max_attempts=None, retry_delay=None):
+    """
+    Store the outcome of sending ``emails``: sent, due again after a delay, or dead after ``max_attempts`` or a
+    ``PermanentEmailError``.
+
+    Only the e-mails still held by the claim they were sent under are written, one UPDATE per outcome. An e-mail whose
+    claim timed out while it was sent belongs to the worker that took it over, which records its own outcome.
+    """
+    max_attempts = settings.EMAIL_OUTBOX_MAX_ATTEMPTS if max_attempts is None else max_attempts
+    now = timezone.now()
+    outcomes = {"sent": [], "retried": [], "dead": []}
+    last_errors, next_attempts = {"retried": {}, "dead": {}}, {}
+    for email, error in zip(emails, errors):
+        if error is None:
+            outcomes["sent"].append(email.pk)
+            continue
+        outcome = "dead" if isinstance(error, PermanentEmailError) or email.attempts >= max_attempts else "retried"
+        outcomes[outcome].append(email.pk)
+        last_errors[outcome][email.pk] = f"{type(error).__name__}: {error}"
+        if outcome == "retried":
+            next_attempts[email.pk] = now + get_retry_delay(email.attempts, retry_delay)
+
+    changes = {
+        "sent": {"status": EmailOutbox.SENT, "sent_at": now, "last_error": ""},
+        "retried": {
+            "status": EmailOutbox.PENDING,
+            "next_attempt_at": get_per_email_value(next_attempts, "next_attempt_at"),
+            "last_error": get_per_email_value(last_errors["retried"], "last_error"),
+        },
+        "dead": {"status": EmailOutbox.DEAD, "last_error": get_per_email_value(last_errors["dead"], "last_error")},
+    }
+    held = EmailOutbox.objects.filter(status=EmailOutbox.SENDING, claim__in={email.claim for email in emails})
+    counts = Counter()
+    for outcome, pks in outcomes.items():
+        if pks and (updated := held.filter(pk__in=pks).update(claim=None, claimed_until=None, **changes[outcome])):
+            counts[outcome] = updated
+    return counts
+
+
+def drain_outbox(transport=None, workers=4, batch_size=100, max_attempts=None, retry_delay=None):
+    """
+    Send every due e-mail of the outbox and return how many were ``sent``, ``retried`` and ``dead``.
+
+    E-mails are claimed ``batch_size`` at a time and sent by at most ``workers`` threads, the database is only used from
+    the calling thread. A broadcast, e.g. a memo to every college, is sent in batches when the transport supports it.
+    """
+    transport = transport or get_transport()
+    counts = Counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="email-worker") as executor:
+        while emails := claim_emails(batch_size):
+            groups = group_emails(transport, emails)
+            errors = [error for group_errors in executor.map(lambda group: send_emails(transport, group), groups) for error in group_errors]
+            counts.update(record_results([email for group in groups for email in group], errors, max_attempts, retry_delay))
+    return counts
@@ -0,0 +1,250 @@
+import base64
+import datetime
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page
+from django.core.paginator import Paginator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db import transaction
+from django.db.models import F
+from django.db.models import OrderBy
+from django.db.models import Q
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+from django_tables2.rows import BoundRows
+
+
+def get_table_queryset(object_list):
+    """The queryset behind the rows of a django-tables2 table (or ``object_list`` itself), or ``None``."""
+    queryset = getattr(getattr(object_list, "data", None), "data", object_list)
+    return queryset if isinstance(queryset, QuerySet) else None
+
+
+def get_count_versions(*models):
+    """Return the current version token of the list counts of each model, creating a fresh token for models that have none."""
+    keys = [f"list_count:version:{model._meta.label_lower}" for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_count_version(*models):
+    """Invalidate the cached list counts of the given models once the current transaction commits."""
+    keys = [f"list_count:version:{model._meta.label_lower}" for model in set(models)]
+    transaction.on_commit(lambda: cache.set_many({key: uuid.uuid4().hex for key in keys}, None))
+
+
+class CachedCountPaginator(Paginator):
+    """
+    Paginator whose row count is cached under ``count_cache_key`` for ``LIST_COUNT_CACHE_TIMEOUT`` seconds.
+
+    With ``estimate_count``, PostgreSQL's planner estimate of the row count is used instead of a ``COUNT(*)`` once it
+    reaches ``estimate_threshold`` rows; ``estimated`` tells the template to show the count as approximate.
+    """
+
+    estimate_threshold = 100_000
+
+    def __init__(self, object_list, per_page, count_cache_key=None, estimate_count=False, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_cache_key = count_cache_key
+        self.estimate_count = estimate_count
+        self._estimated = False
+
+    @cached_property
+    def count(self):
+        cached = cache.get(self.count_cache_key) if self.count_cache_key else None
+        if cached is not None:
+            count, self._estimated = cached
+            return count
+
+        count = self.get_estimated_count() if self.estimate_count else None
+        self._estimated = count is not None
+        if count is None:
+            count = Paginator.count.func(self)
+        if self.count_cache_key:
+            cache.set(self.count_cache_key, (count, self._estimated), getattr(settings, "LIST_COUNT_CACHE_TIMEOUT", 60))
+        return count
+
+    @property
+    def estimated(self):
+        self.count  # noqa: B018, computing the count decides whether it is an estimate
+        return self._estimated
+
+    def get_estimated_count(self):
+        """Planner estimate of the number of rows, when the database is PostgreSQL and the estimate is large enough."""
+        queryset = get_table_queryset(self.object_list)
+        if queryset is None or connections[queryset.db].vendor != "postgresql":
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        rows = int(plan[0]["Plan"]["Plan Rows"])
+        return rows if rows >= self.estimate_threshold else None
+
+
+class CursorJSONEncoder(DjangoJSONEncoder):
+    """Keeps the microseconds of times, which ``DjangoJSONEncoder`` rounds to milliseconds, so cursors compare exactly."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPage(Page):
+    """A page of a ``KeysetPaginator``, linked to its neighbours by cursors instead of page numbers."""
+
+    cursor_pagination = True
+
+    def __init__(self, object_list, paginator, start_index, next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, 1, paginator)
+        self._start_index = start_index
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def start_index(self):
+        return self._start_index
+
+    def end_index(self):
+        return self._start_index + len(self.object_list) - 1
+
+
+class KeysetPaginator(Paginator):
+    """
+    Keyset (cursor) paginator for django-tables2 tables backed by a queryset.
+
+    Rows are sorted by the table ordering (or the queryset ordering) followed by the primary key, and every page is
+    fetched with a ``WHERE`` on the ordering values of the last row of the previous page rather than an ``OFFSET``,
+    so deep pages cost as much as the first one. There is no total count: pages only know whether they have a
+    neighbour, and link to it with ``next_cursor`` / ``previous_cursor``. Nulls sort as the smallest values and a
+    relation in the ordering sorts by its key.
+
+    Use it through ``table_pagination``: ``{"paginator_class": KeysetPaginator, "per_page": 50, "cursor": ...}``.
+    """
+
+    max_per_page = 100
+
+    def __init__(self, object_list, per_page, cursor=None, max_per_page=None, **kwargs):
+        self.max_per_page = max_per_page or self.max_per_page
+        super().__init__(object_list, min(int(per_page), self.max_per_page), **kwargs)
+        self.cursor = cursor
+        self.rows = object_list if isinstance(object_list, BoundRows) else None
+        queryset = get_table_queryset(object_list)
+        if queryset is None:
+            raise ImproperlyConfigured("KeysetPaginator needs table data backed by a queryset.")
+        self.ordering = self.get_ordering(queryset)
+        self.queryset = queryset.annotate(**{f"keyset_{index}": F(field) for index, (field, _) in enumerate(self.ordering)})
+
+    def get_ordering(self, queryset):
+        """``(field, descending)`` pairs the pages are sorted by, always ending with the primary key."""
+        ordering = []
+        for item in queryset.query.order_by or queryset.model._meta.ordering:
+            if isinstance(item, str):
+                if item == "?":
+                    continue
+                ordering.append((item.lstrip("-"), item.startswith("-")))
+            elif isinstance(item, OrderBy) and isinstance(item.expression, F):
+                ordering.append((item.expression.name, item.descending))
+            else:
+                raise ImproperlyConfigured(f"KeysetPaginator cannot paginate on {item!r}, only on fields.")
+        ordering = [("pk" if field in ("pk", queryset.model._meta.pk.name) else field, descending) for field, descending in ordering]
+        if not any(field == "pk" for field, _ in ordering):
+            ordering.append(("pk", False))
+        return ordering[: [field for field, _ in ordering].index("pk") + 1]
+
+    @staticmethod
+    def encode_cursor(values, backwards, start_index):
+        payload = json.dumps({"v": values, "b": backwards, "i": start_index}, cls=CursorJSONEncoder, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """
+        ``(values, backwards, start_index)`` of ``cursor``, or of the first page when it is missing, tampered with or
+        holds values that don't fit the ordering fields.
+        """
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+            values, backwards, start_index = payload["v"], bool(payload["b"]), max(int(payload["i"]), 1)
+        except (ValueError, TypeError, KeyError):
+            return None, False, 1
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            return None, False, 1
+        try:
+            # Filtering converts the values to their fields, e.g. the ISO string of a DateTimeField, without a query
+            self.queryset.filter(self.get_cursor_filter(values, backwards))
+        except (ValidationError, ValueError, TypeError):
+            return None, False, 1
+        return values, backwards, start_index
+
+    def get_cursor_filter(self, values, backwards):
+        """Rows strictly after ``values`` in the page order, or strictly before them when going ``backwards``."""
+        condition = Q(pk__in=[])
+        ties = Q()
+        for (field, descending), value in zip(self.ordering, values):
+            # Going backwards flips every sort direction; with nulls first ascending, None is the smallest value
+            greater = descending == backwards
+            if value is None:
+                beyond = Q(**{f"{field}__isnull": False}) if greater else None
+                equal = Q(**{f"{field}__isnull": True})
+            else:
+                beyond = Q(**{f"{field}__gt" if greater else f"{field}__lt": value})
+                if not greater:
+                    beyond |= Q(**{f"{field}__isnull": True})
+                equal = Q(**{field: value})
+            if beyond is not None:
+                condition |= ties & beyond
+            ties &= equal
+        return condition
+
+    def order(self, queryset, backwards):
+        return queryset.order_by(
+            *[F(field).desc(nulls_last=True) if descending != backwards else F(field).asc(nulls_first=True) for field, descending in self.ordering]
+        )
+
+    def values_of(self, record):
+        return [getattr(record, f"keyset_{index}") for index in range(len(self.ordering))]
+
+    def page(self, number=None):
+        """The page after (or before) ``self.cursor``, or the first page; ``number`` is ignored."""
+        values, backwards, start_index = self.decode_cursor(self.cursor or "")
+        queryset = self.order(self.queryset, backwards)
+        if values is not None:
+            queryset = queryset.filter(self.get_cursor_filter(values, backwards))
+
+        records = list(queryset[: self.per_page + 1])
+        has_more = len(records) > self.per_page
+        records = records[: self.per_page]
+        if backwards:
+            records.reverse()
+            start_index = max(start_index - len(records), 1)
+
+        next_cursor = previous_cursor = None
+        if records:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(self.values_of(records[-1]), False, start_index + len(records))
+            if values is not None and (has_more or not backwards):
+                previous_cursor = self.encode_cursor(self.values_of(records[0]), True, start_index)
+
+        object_list = BoundRows(records, table=self.rows.table) if self.rows is not None else records
+        return KeysetPage(object_list, self, start_index, next_cursor, previous_cursor)
+
+    def validate_number(self, number):
+        return 1
@@ -0,0 +1,52 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django_tables2.utils import Accessor
+
+
+def get_relation_lookups(model, bits):
+    """
+    ``(select_related, prefetch_related)`` lookups for reading the attribute path ``bits`` on instances of ``model``.
+
+    Forward foreign keys and one-to-one relations are joined, the first many-valued relation on the path and everything
+    after it is prefetched. A path ending on a relation renders the related object, so the relations its model declares
+    in ``str_select_related`` are loaded as well.
+    """
+    select_related, prefetch_related = [], []
+    path, many = [], False
+    for bit in bits:
+        try:
+            field = model._meta.get_field(bit)
+        except FieldDoesNotExist:
+            break
+        if not field.is_relation or field.related_model is None:
+            break
+        path.append(bit)
+        many = many or field.many_to_many or field.one_to_many
+        if not many:
+            select_related.append("__".join(path))
+        model = field.related_model
+
+    if path and len(path) == len(bits):
+        relation = "__".join(path)
+        related = [f"{relation}__{lookup}" for lookup in getattr(model, "str_select_related", ())]
+        if many:
+            prefetch_related.extend(related)
+        else:
+            select_related.extend(related)
+    if many and not prefetch_related:
+        prefetch_related.append("__".join(path))
+    return select_related, prefetch_related
+
+
+@lru_cache(maxsize=256)
+def plan_related_lookups(model, table_class):
+    """``(select_related, prefetch_related)`` of the relations rendered by the columns of ``table_class``."""
+    select_related, prefetch_related = [], []
+    for name, column in table_class.base_columns.items():
+        joins, prefetches = get_relation_lookups(model, Accessor(column.accessor or name).bits)
+        select_related.extend(lookup for lookup in joins if lookup not in select_related)
+        prefetch_related.extend(lookup for lookup in prefetches if lookup not in prefetch_related)
+    # A nested join already joins the relations on its way
+    select_related = [lookup for lookup in select_related if not any(other.startswith(f"{lookup}__") for other in select_related)]
+    return tuple(select_related), tuple(prefetch_related)
@@ -0,0 +1,188 @@
+import html
+import logging
+import re
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.postgres.search import SearchQuery
+from django.contrib.postgres.search import SearchRank
+from django.db import IntegrityError
+from django.db import OperationalError
+from django.db import connections
+from django.db import transaction
+from django.db.models import F
+from django.db.models import FloatField
+from django.db.models import Func
+from django.db.models import OuterRef
+from django.db.models import Prefetch
+from django.db.models import Q
+from django.db.models import Subquery
+from django.db.models import Value
+from django.db.models.expressions import RawSQL
+from django.utils.html import strip_tags
+
+from .models import SearchEntry
+
+
+logger = logging.getLogger(__name__)
+
+# Tries of a search index update losing to concurrent writers, and the wait before the second one (doubling after)
+SEARCH_INDEX_ATTEMPTS = 3
+SEARCH_INDEX_RETRY_DELAY = 0.2
+
+# Identifying text (title) ranks ten times higher than the rest (body), on both databases
+TITLE_WEIGHT = 10.0
+# PostgreSQL text search configuration, "simple" keeps ids, names and mixed-language text as typed
+SEARCH_CONFIG = "simple"
+
+
+def plain_text(value):
+    """Text of an HTML field without tags and entities."""
+    return html.unescape(strip_tags(value or "")).strip()
+
+
+def join_text(*values):
+    return " ".join(str(value) for value in values if value)
+
+
+def get_request_submission_documents(queryset):
+    """``(pk, title, body)`` of request submissions: id, type and college, then description and history remarks."""
+    from masters.models import RequestSubmissionStatusHistory
+
+    history = RequestSubmissionStatusHistory.objects.exclude(remark__isnull=True).exclude(remark="").only("submission_id", "remark").order_by()
+    queryset = queryset.select_related("title", "college").prefetch_related(Prefetch("status_history", queryset=history, to_attr="remarked_history"))
+    for submission in queryset.iterator(chunk_size=500):
+        title = join_text(submission.request_id, submission.title, submission.college)
+        body = join_text(plain_text(submission.description), plain_text(submission.alternative_description), *(plain_text(h.remark) for h in submission.remarked_history))
+        yield submission.pk, title, body
+
+
+def get_user_profile_documents(queryset):
+    """``(pk, title, body)`` of user profiles: name and profile id, then contact details."""
+    for profile in queryset.select_related("user").iterator(chunk_size=500):
+        title = join_text(profile.first_name, profile.last_name, profile.profile_id)
+        body = join_text(profile.email, profile.user.email if profile.user else None, profile.mobile, profile.whatsapp)
+        yield profile.pk, title, body
+
+
+# Models covered by the search index and the function building their documents from a queryset
+SEARCH_DOCUMENTS = {
+    "masters.requestsubmission": get_request_submission_documents,
+    "users.userprofile": get_user_profile_documents,
+}
+
+
+def is_searchable(model):
+    return model._meta.label_lower in SEARCH_DOCUMENTS
+
+
+def update_search_index(queryset):
+    """Create or refresh the search entries of the objects in ``queryset``, in one transaction."""
+    content_type = ContentType.objects.get_for_model(queryset.model)
+    with transaction.atomic(using=queryset.db):
+        documents = {pk: (title, body) for pk, title, body in SEARCH_DOCUMENTS[queryset.model._meta.label_lower](queryset)}
+        if not documents:
+            return 0
+
+        entries = SearchEntry.objects.filter(content_type=content_type, object_id__in=documents)
+        changed = []
+        for entry in entries:
+            title, body = documents.pop(entry.object_id)
+            if (entry.title, entry.body) != (title, body):
+                entry.title, entry.body = title, body
+                changed.append(entry)
+        SearchEntry.objects.bulk_update(changed, ["title", "body"], batch_size=500)
+        SearchEntry.objects.bulk_create(
+            [SearchEntry(content_type=content_type, object_id=pk, title=title, body=body) for pk, (title, body) in documents.items()], batch_size=500
+        )
+    return len(changed) + len(documents)
+
+
+def index_on_commit(queryset):
+    """
+    Update the search entries of ``queryset`` once the current transaction commits (at once outside a transaction).
+
+    The index is written after the change it follows, so it never holds up that transaction. A write that fails
+    because of a concurrent writer, e.g. SQLite being busy or two writers creating the entry of the same object, is
+    retried; one that keeps failing is logged and left to ``manage.py rebuild_search_index``.
+    """
+
+    def index():
+        for attempt in range(1, SEARCH_INDEX_ATTEMPTS + 1):
+            try:
+                return update_search_index(queryset)
+            except (OperationalError, IntegrityError):
+                if attempt == SEARCH_INDEX_ATTEMPTS:
+                    logger.exception("Search index update of %s failed.", queryset.model._meta.label)
+                    return 0
+                time.sleep(SEARCH_INDEX_RETRY_DELAY * 2 ** (attempt - 1))
+
+    transaction.on_commit(index, using=queryset.db)
+
+
+def rebuild_search_index(*models):
+    """Index every object of the given searchable models, or of all of them, and drop the entries of deleted objects."""
+    from django.apps import apps
+
+    models = models or [apps.get_model(label) for label in SEARCH_DOCUMENTS]
+    indexed = 0
+    for model in models:
+        content_type = ContentType.objects.get_for_model(model)
+        SearchEntry.objects.filter(content_type=content_type).exclude(object_id__in=model._base_manager.values("pk")).delete()
+        indexed += update_search_index(model._base_manager.all())
+    return indexed
+
+
+def parse_search_query(query):
+    """Lowercase words of ``query``; every word must match, as a prefix, for an object to be found."""
+    return re.findall(r"\w+", (query or "").lower())[:10]
+
+
+class FTS5Rank(Func):
+    """Relevance (higher is better) of the search entry with id ``rowid`` for an FTS5 ``match`` expression."""
+
+    output_field = FloatField()
+
+    def __init__(self, rowid, match):
+        super().__init__(rowid, match)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        rowid_sql, rowid_params = compiler.compile(self.source_expressions[0])
+        match_sql, match_params = compiler.compile(self.source_expressions[1])
+        sql = (
+            f"(SELECT -bm25(core_searchentry_fts, {TITLE_WEIGHT}, 1.0) FROM core_searchentry_fts "
+            f"WHERE core_searchentry_fts MATCH {match_sql} AND core_searchentry_fts.rowid = {rowid_sql})"
+        )
+        return sql, (*match_params, *rowid_params)
+
+
+def search(queryset, query):
+    """
+    Filter ``queryset`` (of a searchable model) down to the objects matching ``query`` and annotate their ``search_rank``.
+
+    Matching runs on the FTS5 index on SQLite and on the GIN-indexed ``document`` on PostgreSQL; other databases fall
+    back to a case-insensitive scan of the entries.
+    """
+    terms = parse_search_query(query)
+    if not terms:
+        return queryset.none()
+
+    entries = SearchEntry.objects.filter(content_type=ContentType.objects.get_for_model(queryset.model))
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        matches = entries.filter(pk__in=RawSQL("SELECT rowid FROM core_searchentry_fts WHERE core_searchentry_fts MATCH %s", [match]))
+        rank = entries.annotate(rank=FTS5Rank(F("pk"), Value(match)))
+    elif vendor == "postgresql":
+        search_query = SearchQuery(" & ".join(f"{term}:*" for term in terms), config=SEARCH_CONFIG, search_type="raw")
+        matches = entries.filter(document=search_query)
+        rank = entries.annotate(rank=SearchRank(F("document"), search_query, weights=[0.0, 0.0, 1 / TITLE_WEIGHT, 1.0]))
+    else:
+        matches = entries
+        for term in terms:
+            matches = matches.filter(Q(title__icontains=term) | Q(body__icontains=term))
+        rank = entries.annotate(rank=Value(1.0, output_field=FloatField()))
+
+    return queryset.filter(pk__in=matches.values("object_id")).annotate(
+        search_rank=Subquery(rank.filter(object_id=OuterRef("pk")).values("rank")[:1], output_field=FloatField())
+    )
@@ -0,0 +1,64 @@
+from django.db import IntegrityError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import DocumentSequence
+from .models import get_default_document_settings
+
+
+# Digits numbers are zero-filled to, unless the document settings give "digits"
+NUMBER_DIGITS = 4
+
+
+def get_document_setting(document_type):
+    """Settings of ``document_type`` in ``get_default_document_settings``, nested types are dotted, e.g. ``invoice.hotel``."""
+    setting = get_default_document_settings()
+    for key in document_type.split("."):
+        if not isinstance(setting, dict) or key not in setting:
+            raise LookupError(f'No document settings for "{document_type}".')
+        setting = setting[key]
+    if "prefix" not in setting:
+        raise LookupError(f'"{document_type}" groups other document types, use one of them.')
+    return setting
+
+
+def allocate_number(prefix, year=0, start_count=1):
+    """
+    Next number of the ``(prefix, year)`` sequence.
+
+    The counter row is incremented with a single UPDATE, which locks it (the whole database on SQLite, see
+    ``core.db.sqlite3``) until the surrounding transaction ends, so concurrent callers wait for each other instead of
+    reading the same number. The first caller of a new sequence
+    creates its row, starting at ``start_count``.
+    """
+    sequence = DocumentSequence.objects.filter(prefix=prefix, year=year)
+    with transaction.atomic():
+        if not sequence.update(last_number=F("last_number") + 1):
+            try:
+                with transaction.atomic():
+                    DocumentSequence.objects.create(prefix=prefix, year=year, last_number=start_count)
+                return start_count
+            except IntegrityError:
+                # Created by a concurrent caller in the meantime
+                sequence.update(last_number=F("last_number") + 1)
+        return sequence.values_list("last_number", flat=True).get()
+
+
+def format_document_number(prefix, number, year=0, digits=NUMBER_DIGITS):
+    if year:
+        return f"{prefix}{year}-{str(number).zfill(digits)}"
+    return f"{prefix}{str(number).zfill(digits)}"
+
+
+def next_document_number(document_type, date=None):
+    """
+    Next number of ``document_type`` with its prefix, e.g. ``REQ0042``.
+
+    Types with ``"yearly": True`` in their settings are numbered per year of ``date`` (today by default), e.g.
+    ``RCPT2026-0042``. The counter is the sequence of the prefix, or of the ``"sequence"`` name in the settings.
+    """
+    setting = get_document_setting(document_type)
+    year = (date or timezone.localdate()).year if setting.get("yearly") else 0
+    number = allocate_number(setting.get("sequence", setting["prefix"]), year, setting.get("start_count", 1))
+    return format_document_number(setting["prefix"], number, year, setting.get("digits", NUMBER_DIGITS))
@@ -1,10 +1,17 @@
 from django.contrib.auth.signals import user_logged_in
 from django.dispatch import receiver
 from django.utils import timezone
-from django.db.models.signals import post_save
-from core.models import Notification
-from core.utils import send_notification_email, get_notification_email_html, get_memo_notification_email_html
-from django.contrib.sites.models import Site
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from core.dashboard import GLOBAL_SCOPE, bump_dashboard_version, get_request_scopes
+from core.paginators import bump_count_version
+from core.models import Notification, SearchEntry
+from core.search import index_on_commit
+from masters.models import RequestSubmission, RequestSubmissionStatusHistory, RequestSubmissionType
+from accounts.models import User
+from users.models import UserProfile
+from core.notifications import MEMO_KIND, NOTIFICATION_KIND, dispatch_notifications, get_notification_domain
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 
 @receiver(user_logged_in)
 def post_login(sender, user, request, **kwargs):
@@ -15,37 +22,96 @@ def post_login(sender, user, request, **kwargs):
 
 @receiver(post_save, sender=Notification)
 def send_notification_email_signal(sender, instance, created, **kwargs):
-    # Try to get the domain from the request if available (for signals triggered by a view)
-    request = None
-    if hasattr(instance, '_request'):
-        request = instance._request
-    domain = None
-    if request:
-        domain = request.scheme + '://' + request.get_host()
-    else:
-        # Fallback to Site framework or settings
-        try:
-            domain = 'https://' + Site.objects.get_current().domain
-        except Exception:
-            from django.conf import settings
-            domain = getattr(settings, 'DEFAULT_DOMAIN', 'http://localhost:8000')
+    # Notifications saved one by one, see core.notifications.notify for the ones created together. The e-mail is
+    # queued in the outbox, in the transaction saving the notification.
     if created and instance.user.email:
-        # Check if this is a memo notification
+        kind, extra = NOTIFICATION_KIND, None
         if "memo published" in instance.message.lower():
-            subject = "New Memo Published - Jamia Admin ERP"
-            # Extract memo title from the message
-            memo_title = instance.message.replace("New memo published: ", "")
-            # Get memo description if available
-            memo_description = getattr(instance, '_memo_description', "A new memo has been published and is now available for viewing.")
-            # For memo notifications, we'll use a more specific template
-            html_content = get_memo_notification_email_html(
-                memo_title=memo_title,
-                memo_description=memo_description,
-                url=instance.url,
-                domain=domain
-            )
-        else:
-            subject = "New Notification from Jamia Admin ERP"
-            html_content = get_notification_email_html(instance.message, instance.url, domain=domain)
-        
-        send_notification_email(instance.user.email, subject, html_content)
\ No newline at end of file
+            kind = MEMO_KIND
+            extra = {"title": instance.message.replace("New memo published: ", ""), "description": getattr(instance, "_memo_description", None)}
+        dispatch_notifications([instance], kind, extra, get_notification_domain(getattr(instance, "_request", None)))
+
+
+@receiver([post_save, post_delete], sender=RequestSubmission)
+def invalidate_request_dashboards(sender, instance, **kwargs):
+    bump_dashboard_version(*get_request_scopes(instance))
+
+
+@receiver([post_save, post_delete], sender=RequestSubmissionStatusHistory)
+def invalidate_status_history_dashboards(sender, instance, **kwargs):
+    bump_dashboard_version(*get_request_scopes(instance.submission, instance.usertype, instance.next_usertype))
+
+
+@receiver(m2m_changed, sender=RequestSubmissionStatusHistory.submitted_users.through)
+def invalidate_submitted_users_dashboards(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and isinstance(instance, RequestSubmissionStatusHistory):
+        bump_dashboard_version(*get_request_scopes(instance.submission, instance.usertype))
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_profile_dashboards(sender, instance, **kwargs):
+    # Profile totals are shown on every dashboard
+    bump_dashboard_version(GLOBAL_SCOPE)
+
+
+@receiver(post_save, sender=Notification)
+def invalidate_notification_dashboards(sender, instance, **kwargs):
+    bump_dashboard_version(instance.user.usertype)
+
+
+@receiver([post_save, post_delete, m2m_changed])
+def invalidate_list_counts(sender, instance, action=None, model=None, **kwargs):
+    # Only the project's own models back list views, and m2m changes count once they are applied
+    if sender._meta.app_label not in settings.MODULES or (action and not action.startswith("post_")):
+        return
+    bump_count_version(*{sender, type(instance), model} - {None})
+
+
+@receiver(post_save, sender=RequestSubmission)
+def index_request_submission(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_on_commit(RequestSubmission.objects.filter(pk=instance.pk))
+
+
+@receiver([post_save, post_delete], sender=RequestSubmissionStatusHistory)
+def index_status_history_remark(sender, instance, raw=False, **kwargs):
+    # History remarks are part of the searchable text of their request
+    if not raw and instance.remark:
+        index_on_commit(RequestSubmission.objects.filter(pk=instance.submission_id))
+
+
+@receiver(post_save, sender=RequestSubmissionType)
+def index_request_submission_type(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        index_on_commit(RequestSubmission.objects.filter(title=instance))
+
+
+@receiver(pre_save, sender=UserProfile)
+def track_profile_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    # The college name is part of the searchable text of its requests, which are only reindexed when it changes
+    instance._name_changed = False
+    if raw or instance._state.adding or (update_fields is not None and not {"first_name", "last_name"} & set(update_fields)):
+        return
+    previous = UserProfile.objects.filter(pk=instance.pk).values_list("first_name", "last_name").first()
+    instance._name_changed = previous is not None and previous != (instance.first_name, instance.last_name)
+
+
+@receiver(post_save, sender=UserProfile)
+def index_user_profile(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    index_on_commit(UserProfile.objects.filter(pk=instance.pk))
+    if getattr(instance, "_name_changed", False):
+        index_on_commit(RequestSubmission.objects.filter(college=instance))
+
+
+@receiver(post_save, sender=User)
+def index_user_email(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not created and not raw and set(update_fields or ()) != {"last_login"}:
+        index_on_commit(UserProfile.objects.filter(user=instance))
+
+
+@receiver(post_delete, sender=RequestSubmission)
+@receiver(post_delete, sender=UserProfile)
+def remove_search_entry(sender, instance, **kwargs):
+    SearchEntry.objects.filter(content_type=ContentType.objects.get_for_model(sender), object_id=instance.pk).delete()
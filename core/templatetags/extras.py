@@ -58,6 +58,18 @@ def month_name(month_number):
     return calendar.month_name[month_number]
 
 
+@register.filter
+def dwell_time(seconds):
+    """Short human readable form of a duration in seconds, e.g. 45m, 5.5h or 3.2d."""
+    if seconds is None:
+        return "-"
+    if seconds < 3600:
+        return f"{round(seconds / 60)}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+
 @register.filter
 def user_type_allowed(user_type, allowed_types):
     return user_type in allowed_types
@@ -1 +1,376 @@
+import io
+import json
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from unittest import mock
 
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.db import connections
+from django.db import transaction
+from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from masters.tests import QueryBudgetTestCase
+from sib_api_v3_sdk.rest import ApiException
+from users.models import UserProfile
+
+from .brevo import send_broadcast
+from .dashboard import DASHBOARD_WIDGETS
+from .models import EmailOutbox
+from .models import Notification
+from .models import SearchEntry
+from .notifications import MEMO_KIND
+from .notifications import notify
+from .outbox import BrevoTransport
+from .outbox import PermanentEmailError
+from .outbox import claim_emails
+from .outbox import drain_outbox
+from .outbox import queue_email
+from .outbox import queue_emails
+from .outbox import record_results
+from .search import index_on_commit
+
+
+# Queries of one uncached widget request, including the session and user lookups
+WIDGET_QUERY_BUDGETS = {
+    "counters": 10,
+    "recent_assigned": 5,
+    "recent_changes": 4,
+    "status_distribution": 7,
+    "stage_dwell": 5,
+    "monthly": 6,
+    "usertype_distribution": 3,
+}
+
+
+@override_settings(DASHBOARD_CACHE_ENABLED=False)
+class DashboardQueryBudgetTest(QueryBudgetTestCase):
+    def test_home_shell(self):
+        for user in self.users:
+            with self.subTest(usertype=user.usertype or "superuser"):
+                self.client.force_login(user)
+                with self.assertQueryBudget(6, max_seconds=1):
+                    response = self.client.get(reverse("core:home"))
+                self.assertEqual(response.status_code, 200)
+
+    def test_dashboard_widgets(self):
+        for user in self.users:
+            self.client.force_login(user)
+            for widget in DASHBOARD_WIDGETS:
+                with self.subTest(usertype=user.usertype or "superuser", widget=widget):
+                    with self.assertQueryBudget(WIDGET_QUERY_BUDGETS[widget]):
+                        response = self.client.get(reverse("core:dashboard_widget", args=[widget]))
+                    self.assertEqual(response.status_code, 200)
+
+    @override_settings(DASHBOARD_CACHE_ENABLED=True)
+    def test_cached_dashboard_widgets(self):
+        for user in self.users:
+            self.client.force_login(user)
+            for widget in DASHBOARD_WIDGETS:
+                self.client.get(reverse("core:dashboard_widget", args=[widget]))
+                with self.subTest(usertype=user.usertype or "superuser", widget=widget):
+                    # Session and user, then the version tokens and the snapshot from the database cache
+                    with self.assertQueryBudget(4, max_seconds=1):
+                        response = self.client.get(reverse("core:dashboard_widget", args=[widget]))
+                    self.assertEqual(response.status_code, 200)
+
+    @override_settings(DASHBOARD_CACHE_ENABLED=True, DASHBOARD_CACHE_TIMEOUT=42)
+    def test_dashboard_widget_timeouts(self):
+        self.client.force_login(self.superuser)
+        for widget, policy in DASHBOARD_WIDGETS.items():
+            with self.subTest(widget=widget), mock.patch("core.dashboard.cache.set") as cache_set:
+                self.client.get(reverse("core:dashboard_widget", args=[widget]))
+                self.assertEqual(cache_set.call_args.args[2], policy.get("timeout", 42))
+
+
+class NotificationQueryBudgetTest(QueryBudgetTestCase):
+    def test_notification_list(self):
+        for user in self.users:
+            with self.subTest(usertype=user.usertype or "superuser"):
+                self.client.force_login(user)
+                with self.assertQueryBudget(6, max_seconds=1):
+                    response = self.client.get(reverse("core:notification_list"))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["count"], self.notification_count)
+
+
+class NotifyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(User(email=f"college{index}@example.com", usertype="College") for index in range(50))
+
+    def test_notify_creates_in_one_insert_and_queues_emails(self):
+        recipients = self.users + [User.objects.create(email="", usertype="College"), None, self.users[0]]
+        with CaptureQueriesContext(connection) as context:
+            notifications = notify(recipients, "New memo published: Holidays", "/memo/1/", kind=MEMO_KIND, extra={"title": "Holidays"})
+        inserts = Counter(re.match(r'INSERT INTO "(\w+)"', query["sql"]).group(1) for query in context.captured_queries if query["sql"].startswith("INSERT"))
+        self.assertEqual(inserts, {"core_notification": 1, "core_emailoutbox": 1})
+
+        self.assertEqual(len(notifications), len(self.users) + 1)
+        self.assertEqual(Notification.objects.count(), len(self.users) + 1)
+        emails = EmailOutbox.objects.all()
+        self.assertEqual(sorted(email.to_email for email in emails), sorted(user.email for user in self.users))
+        self.assertTrue(all(email.status == EmailOutbox.PENDING and email.subject == "New Memo Published - Jamia Admin ERP" for email in emails))
+
+    def test_rolled_back_notifications_queue_nothing(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            notify(self.users, "Request assigned: Fee Concession", "/request/1/")
+            raise RuntimeError
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(EmailOutbox.objects.exists())
+
+    def test_notify_nobody(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(notify([], "Message", "/"), [])
+
+
+class FakeTransport:
+    """Records the e-mails it sends and fails for the addresses in ``failing``, ``delay`` seconds per e-mail."""
+
+    def __init__(self, failing=(), delay=0):
+        self.failing = set(failing)
+        self.delay = delay
+        self.sent = []
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def send(self, email):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if email.to_email in self.failing:
+                raise ConnectionError("Provider unavailable")
+            with self.lock:
+                self.sent.append(email.to_email)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+
+class EmailWorkerTest(TestCase):
+    def queue(self, count, domain="example.com"):
+        return queue_emails((f"user{index}@{domain}", "Subject", "<p>Body</p>") for index in range(count))
+
+    def make_due(self):
+        EmailOutbox.objects.filter(status=EmailOutbox.PENDING).update(next_attempt_at=timezone.now())
+
+    def test_drain_sends_every_due_email(self):
+        self.queue(25)
+        transport = FakeTransport(delay=0.01)
+        counts = drain_outbox(transport, workers=4, batch_size=10)
+        self.assertEqual(counts, {"sent": 25})
+        self.assertEqual(sorted(transport.sent), sorted(f"user{index}@example.com" for index in range(25)))
+        self.assertFalse(EmailOutbox.objects.exclude(status=EmailOutbox.SENT).exists())
+        self.assertFalse(EmailOutbox.objects.filter(sent_at__isnull=True).exists())
+        # Sent concurrently, but never by more threads than workers
+        self.assertGreater(transport.max_in_flight, 1)
+        self.assertLessEqual(transport.max_in_flight, 4)
+
+    def test_failed_emails_are_retried_with_backoff_then_dead(self):
+        self.queue(3)
+        failing = queue_email("broken@example.com", "Subject", "<p>Body</p>")
+        transport = FakeTransport(failing={"broken@example.com"})
+
+        started = timezone.now()
+        self.assertEqual(drain_outbox(transport, max_attempts=3, retry_delay=60), {"sent": 3, "retried": 1})
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), (EmailOutbox.PENDING, 1))
+        self.assertIn("Provider unavailable", failing.last_error)
+        self.assertGreaterEqual(failing.next_attempt_at, started + timedelta(seconds=60))
+        # Not due before its retry delay
+        self.assertEqual(drain_outbox(transport, max_attempts=3, retry_delay=60), {})
+
+        self.make_due()
+        started = timezone.now()
+        self.assertEqual(drain_outbox(transport, max_attempts=3, retry_delay=60), {"retried": 1})
+        failing.refresh_from_db()
+        self.assertEqual(failing.attempts, 2)
+        self.assertGreaterEqual(failing.next_attempt_at, started + timedelta(seconds=120))
+
+        self.make_due()
+        self.assertEqual(drain_outbox(transport, max_attempts=3, retry_delay=60), {"dead": 1})
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), (EmailOutbox.DEAD, 3))
+        self.assertEqual(transport.sent.count("broken@example.com"), 0)
+
+    def test_emails_of_a_stopped_worker_are_taken_over(self):
+        stale, held = self.queue(2)
+        now = timezone.now()
+        EmailOutbox.objects.filter(pk=stale.pk).update(status=EmailOutbox.SENDING, claimed_until=now - timedelta(seconds=1), attempts=1)
+        EmailOutbox.objects.filter(pk=held.pk).update(status=EmailOutbox.SENDING, claimed_until=now + timedelta(minutes=1), attempts=1)
+
+        transport = FakeTransport()
+        self.assertEqual(drain_outbox(transport), {"sent": 1})
+        self.assertEqual(transport.sent, [stale.to_email])
+        self.assertEqual(EmailOutbox.objects.get(pk=stale.pk).attempts, 2)
+        self.assertEqual(EmailOutbox.objects.get(pk=held.pk).status, EmailOutbox.SENDING)
+
+    def test_results_of_a_taken_over_claim_are_ignored(self):
+        late, failed, kept = self.queue(3)
+        emails = claim_emails(3)
+        # The claim of ``late`` timed out while it was sent and another worker took it over
+        EmailOutbox.objects.filter(pk=late.pk).update(claim=uuid.uuid4(), attempts=2)
+
+        counts = record_results(emails, [None, ConnectionError("Provider unavailable"), None], max_attempts=3, retry_delay=60)
+        self.assertEqual(counts, {"sent": 1, "retried": 1})
+        late.refresh_from_db()
+        self.assertEqual((late.status, late.attempts, late.sent_at), (EmailOutbox.SENDING, 2, None))
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.claim), (EmailOutbox.PENDING, None))
+        self.assertIn("Provider unavailable", failed.last_error)
+        self.assertEqual(EmailOutbox.objects.get(pk=kept.pk).status, EmailOutbox.SENT)
+
+    @override_settings(EMAIL_OUTBOX_TRANSPORT="core.tests.FakeTransport")
+    def test_run_email_worker_once(self):
+        self.queue(5)
+        stdout = io.StringIO()
+        # The worker drops stale connections between rounds, the one holding this test's transaction must stay open
+        with mock.patch("core.management.commands.run_email_worker.close_old_connections"):
+            call_command("run_email_worker", "--once", "--workers=2", stdout=stdout)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.SENT).count(), 5)
+        self.assertIn("Sent 5, retrying 0, dead 0.", stdout.getvalue())
+
+
+class BrevoStandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        recipients = [version["to"][0]["email"] for version in body.get("messageVersions", [])] or [to["email"] for to in body["to"]]
+        self.server.requests.append({"path": self.path, "api_key": self.headers["api-key"], "port": self.client_address[1], "body": body})
+        refused = [email for email in recipients if email in self.server.refused]
+        if self.server.unavailable:
+            status, payload = 503, {"code": "service_unavailable", "message": "Try again later"}
+        elif refused:
+            status, payload = 400, {"code": "invalid_parameter", "message": f"Refused recipients: {', '.join(refused)}"}
+        else:
+            self.server.sent.extend(recipients)
+            status, payload = 201, {"messageIds": [f"<{len(self.server.sent) + index}@stand-in>" for index in range(len(recipients))]}
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class BrevoBroadcastTest(TestCase):
+    """Sends through the Brevo SDK to a local stand-in of the API, which records the calls and can refuse recipients."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), BrevoStandInHandler)
+        cls.server_thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+        cls.settings_override = override_settings(BREVO_API_URL=f"http://127.0.0.1:{cls.server.server_port}/v3", BREVO_API_KEY="test-key")
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests, self.server.sent, self.server.refused, self.server.unavailable = [], [], set(), False
+
+    def test_broadcast_sends_one_call_per_batch(self):
+        recipients = [(f"college{index}@example.com", {"name": f"College {index}"}) for index in range(250)]
+        results = send_broadcast(recipients, "New Memo", "<p>Dear {{ params.name }}</p>", batch_size=100)
+
+        self.assertEqual(results, {email: None for email, _ in recipients})
+        self.assertEqual([len(request["body"]["messageVersions"]) for request in self.server.requests], [100, 100, 50])
+        first = self.server.requests[0]
+        self.assertEqual((first["path"], first["api_key"], first["body"]["subject"]), ("/v3/smtp/email", "test-key", "New Memo"))
+        self.assertEqual(first["body"]["messageVersions"][1], {"to": [{"email": "college1@example.com"}], "params": {"name": "College 1"}})
+        self.assertEqual(sorted(self.server.sent), sorted(email for email, _ in recipients))
+        # The pooled client keeps its connection open between calls
+        self.assertEqual(len({request["port"] for request in self.server.requests}), 1)
+
+    def test_broadcast_reports_failures_per_recipient(self):
+        self.server.refused = {"refused@example.com"}
+        recipients = [f"college{index}@example.com" for index in range(7)] + ["refused@example.com", "not an address", "college0@example.com"]
+        results = send_broadcast(recipients, "New Memo", "<p>Memo</p>", batch_size=100)
+
+        self.assertIsInstance(results.pop("refused@example.com"), ApiException)
+        self.assertIsInstance(results.pop("not an address"), ValidationError)
+        self.assertEqual(results, {f"college{index}@example.com": None for index in range(7)})
+        # The refused recipient is isolated by splitting its batch, everyone else gets the e-mail once
+        self.assertEqual(sorted(self.server.sent), sorted(results))
+
+    def test_transport_marks_refused_recipients_permanent(self):
+        self.server.refused = {"refused@example.com"}
+        transport = BrevoTransport()
+        with self.assertRaises(PermanentEmailError):
+            transport.send(queue_email("refused@example.com", "Subject", "<p>Body</p>"))
+        self.server.unavailable = True
+        with self.assertRaises(ApiException):
+            transport.send(queue_email("college0@example.com", "Subject", "<p>Body</p>"))
+
+    def test_broadcast_when_brevo_is_unavailable(self):
+        self.server.unavailable = True
+        results = send_broadcast(["a@example.com", "b@example.com"], "New Memo", "<p>Memo</p>")
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertTrue(all(isinstance(error, ApiException) and error.status == 503 for error in results.values()))
+
+    def test_worker_sends_broadcasts_in_batches(self):
+        queue_emails((f"college{index}@example.com", "New Memo", "<p>Memo</p>") for index in range(150))
+        queue_email("not an address", "New Memo", "<p>Memo</p>")
+        queue_email("director@example.com", "New Notification", "<p>Request assigned</p>")
+        self.server.refused = {"college3@example.com"}
+
+        counts = drain_outbox(BrevoTransport(), batch_size=200)
+        # Invalid and refused recipients fail again on every attempt, so they are dead at once
+        self.assertEqual(counts, {"sent": 150, "dead": 2})
+        for to_email in ("college3@example.com", "not an address"):
+            email = EmailOutbox.objects.get(to_email=to_email)
+            self.assertEqual((email.status, email.attempts), (EmailOutbox.DEAD, 1))
+        self.assertIn("PermanentEmailError", EmailOutbox.objects.get(to_email="college3@example.com").last_error)
+        self.assertEqual(sorted(self.server.sent), sorted([f"college{index}@example.com" for index in range(150) if index != 3] + ["director@example.com"]))
+        # The memo went out in batches of at most 100, before the one with the refused recipient was split
+        sizes = [len(request["body"].get("messageVersions", ())) for request in self.server.requests]
+        self.assertEqual(sorted(sizes)[-2:], [50, 100])
+
+
+class SearchIndexConcurrencyTest(TransactionTestCase):
+    writers = 4
+
+    def test_concurrent_writers_index_the_same_objects(self):
+        profiles = [UserProfile.objects.create(first_name=f"College {index}") for index in range(20)]
+        SearchEntry.objects.all().delete()
+        barrier = threading.Barrier(self.writers)
+
+        def index_profiles():
+            try:
+                barrier.wait()
+                for profile in profiles:
+                    index_on_commit(UserProfile.objects.filter(pk=profile.pk))
+            finally:
+                connections.close_all()
+
+        with self.assertNoLogs("core.search"), ThreadPoolExecutor(max_workers=self.writers) as executor:
+            for writer in [executor.submit(index_profiles) for _ in range(self.writers)]:
+                writer.result()
+        self.assertEqual(sorted(SearchEntry.objects.values_list("object_id", flat=True)), sorted(profile.pk for profile in profiles))
+        self.assertEqual(SearchEntry.objects.get(object_id=profiles[3].pk).title, f"College 3 {profiles[3].profile_id}")
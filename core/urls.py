@@ -7,6 +7,7 @@ app_name = "core"
 
 urlpatterns = [
     path("", views.HomeView.as_view(), name="home"),
+    path("dashboard/widgets/<slug:widget>/", views.DashboardWidgetView.as_view(), name="dashboard_widget"),
     path('notifications/', views.notification_list, name='notification_list'),
     path('notifications/read/<int:pk>/', views.notification_read_and_redirect, name='notification_read_and_redirect'),
     path('notifications/mark_read/<int:pk>/', views.notification_mark_read, name='notification_mark_read'),
@@ -6,10 +6,6 @@ import requests
 from django.core.files.base import ContentFile
 from django.core.files.storage import default_storage
 
-import sib_api_v3_sdk
-from sib_api_v3_sdk.rest import ApiException
-
-
 from django.urls import reverse_lazy
 from django.utils.http import urlencode
 
@@ -56,38 +52,6 @@ def build_url(viewname, kwargs=None, query_params=None):
 #     return os.path.join(subdir, output_filename)
 
 
-def send_notification_email(to_email, subject, html_content):
-    configuration = sib_api_v3_sdk.Configuration()
-    configuration.api_key['api-key'] = getattr(settings, 'BREVO_API_KEY', None)
-    api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
-    send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
-        to=[{"email": to_email}],
-        sender={"email": settings.DEFAULT_FROM_EMAIL, "name": "Jamia Admin ERP"},
-        subject=subject,
-        html_content=html_content
-    )
-    try:
-        api_instance.send_transac_email(send_smtp_email)
-        print(f"✅ Email sent successfully to {to_email}")
-    except ApiException as e:
-        print(f"❌ Exception when sending email: {e}")
-        if "unauthorized" in str(e).lower() and "ip address" in str(e).lower():
-            print("🔧 IP Authorization Issue:")
-            print("   Your IP address is not authorized in Brevo.")
-            print("   Please add your IP address to the authorized IPs list:")
-            print("   https://app.brevo.com/security/authorised_ips")
-            print("   Current IP: 103.42.196.84")
-        elif "unauthorized" in str(e).lower():
-            print("🔧 API Key Issue:")
-            print("   Your Brevo API key might be invalid or expired.")
-            print("   Please check your API key in the Brevo dashboard.")
-        else:
-            print("🔧 Other Email Error:")
-            print("   Please check your Brevo account settings and API key.")
-    except Exception as e:
-        print(f"❌ Unexpected error when sending email: {e}")
-
-
 def get_notification_email_html(message, url, domain=None):
     # If the url is relative and domain is provided, prepend domain
     if domain and url and url.startswith('/'):
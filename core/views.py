@@ -5,7 +5,8 @@ from django.db.models import Q, F, Subquery, OuterRef, Exists, TextField
 from django.db.models.functions import Cast
 from django.db.models.fields import TextField
 from django_tables2 import RequestConfig
-from django.db.models import Count
+from django_tables2.export import TableExport
+from django.db.models import Count, Max, Min, Sum
 from django.core.files.storage import default_storage
 from core.pdfview import PDFView
 from datetime import datetime, timedelta
@@ -19,23 +20,38 @@ from django.contrib import messages
 from django.shortcuts import get_object_or_404
 from django.shortcuts import redirect
 from django.shortcuts import render
+from django.urls import reverse
 from django.urls import reverse_lazy
 from django.views.decorators.http import require_POST
 
 # Import models
 from accounts.models import User
 from users.models import UserProfile
-from masters.models import RequestSubmission, RequestSubmissionStatusHistory
+from masters.analytics import stage_dwell_stats
+from masters.models import RequestAssignment, RequestStageInterval, RequestStatusRollup, RequestSubmission, RequestSubmissionStatusHistory
+from masters.tables import RequestStageDwellTable
 from django.db import models
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import Http404, JsonResponse, HttpResponseRedirect
+from .dashboard import DASHBOARD_WIDGETS
+from .dashboard import MONTHLY_WINDOWS
+from .dashboard import count_by
+from .dashboard import get_dashboard_role
+from .dashboard import get_dashboard_snapshot
+from .dashboard import monthly_series
 from .models import Notification
-from django.db.models.functions import Lower
 
 
+REQUEST_COUNTER_KEYS = (
+    'total_requests', 'approved_requests', 'rejected_requests', 'pending_requests', 'processing_requests',
+    'assigned_requests_count', 're_assigned_requests_count',
+    'my_requests_count', 'my_pending_requests_count', 'my_approved_requests_count', 'my_rejected_requests_count',
+)
+
 
 class HomeView(mixins.HybridTemplateView):
     template_name = "core/dashboard.html"
+    monthly_stats_months = 6
 
     def get_user_profile_and_usertype(self, user):
         try:
@@ -46,64 +62,93 @@ class HomeView(mixins.HybridTemplateView):
             usertype = getattr(user, 'usertype', None)
         return user_profile, usertype
 
-    def get_status_counts(self, requests_queryset):
-        user = self.request.user
-        user_profile, usertype = self.get_user_profile_and_usertype(user)
+    def get_status_counts(self, user, user_profile, usertype, filtered_requests):
+        """Count every request figure shown on the dashboard in one aggregate query."""
+        counters = dict.fromkeys(REQUEST_COUNTER_KEYS, 0)
+        if not user.is_superuser and not user_profile:
+            return counters
 
-        latest_status_subquery = RequestSubmissionStatusHistory.objects.filter(
-            submission=OuterRef('pk')
-        ).order_by('-date')
-
-        requests_queryset = requests_queryset.annotate(
-            latest_next_usertype=Subquery(latest_status_subquery.values('next_usertype')[:1]),
-            latest_status=Lower(Subquery(latest_status_subquery.values('status')[:1]))
-        )
+        requests_queryset = RequestSubmission.objects.filter(is_active=True)
 
+        in_scope = Q() if user.is_superuser else Q(pk__in=filtered_requests.values('pk'))
+        status_scope = in_scope
         if usertype not in ["OE", "director"] and not user.is_superuser:
-            requests_queryset = requests_queryset.filter(
-                Q(latest_next_usertype=usertype) | Q(creator=user_profile.user)
-            )
+            status_scope &= Q(latest_next_usertype=usertype) | Q(creator=user_profile.user)
+
+        conditions = {
+            'total_requests': in_scope,
+            'approved_requests': status_scope & Q(latest_status='approved'),
+            'rejected_requests': status_scope & Q(latest_status='rejected'),
+            'processing_requests': status_scope & Q(latest_status__in=['pending', 'processing'], latest_next_usertype=usertype),
+            'pending_requests': in_scope & Q(status__in=['pending', 'processing']),
+        }
 
-        approved = requests_queryset.filter(latest_status='approved').count()
-        rejected = requests_queryset.filter(latest_status='rejected').count()
-        processing = requests_queryset.filter(
-            latest_status__in=['pending', 'processing'],
-            latest_next_usertype=usertype
-        ).count()
-        pending = processing
+        if user_profile:
+            mine = Q(created_by=user_profile)
+            conditions.update({
+                'my_requests_count': mine,
+                'my_pending_requests_count': mine & Q(status__in=['pending', 'processing']),
+                'my_approved_requests_count': mine & Q(status='approved'),
+                'my_rejected_requests_count': mine & Q(status='rejected'),
+            })
 
-        my_requests_count = requests_queryset.filter(creator=user_profile.user).count() if user_profile else 0
+            if not user.is_superuser:
+                if usertype == "College":
+                    # For college users, assigned requests are their own requests
+                    conditions['assigned_requests_count'] = mine
+                else:
+                    # For other users, assigned requests are those assigned to them
+                    conditions['assigned_requests_count'] = Q(latest_next_usertype=usertype) & ~mine
+
+                director_reassign_qs = RequestSubmissionStatusHistory.objects.filter(
+                    submission__current_usertype=usertype,
+                    usertype="director",
+                    status="re_assign",
+                    next_usertype=usertype
+                ).values("submission_id")
+                conditions['re_assigned_requests_count'] = Q(id__in=director_reassign_qs) & ~mine
+
+        counters.update(count_by(requests_queryset, **conditions))
+        return counters
+
+    def get_user_counters(self, user, start_of_month, start_of_week):
+        """Count the user and profile figures with one aggregate query per table."""
+        if user.is_superuser:
+            filtered_users = User.objects.filter(is_active=True)
+            profile_scope = Q(is_active=True)
+        else:
+            filtered_users = User.objects.filter(is_active=True, id=user.id)
+            profile_scope = Q(is_active=True, user=user)
 
-        return {
-            'approved': approved,
-            'rejected': rejected,
-            'pending': pending,
-            'processing': processing,
-            'my_requests': my_requests_count,
-        }
+        counters = count_by(
+            filtered_users,
+            active_users=~Q(is_superuser=True),
+            new_users_this_week=~Q(is_superuser=True) & Q(date_joined__gte=start_of_week),
+        )
+        counters.update(count_by(
+            UserProfile.objects.all(),
+            total_users=~Q(user__is_superuser=True, is_active=True),
+            new_users_this_month=Q(user__is_active=True, user__date_joined__gte=start_of_month) & ~Q(user__is_superuser=True),
+            total_profiles=profile_scope,
+            profiles_with_photo=profile_scope & ~Q(photo=''),
+            profiles_with_mobile=profile_scope & ~Q(mobile=''),
+        ))
+        return counters
 
     def get_pending_requests(self, user, user_profile):
         usertype = getattr(user, 'usertype', None)
         queryset = RequestSubmission.objects.filter(is_active=True).exclude(status__in=['approved', 'rejected'])
 
         if user_profile:
-            latest_status_subquery = RequestSubmissionStatusHistory.objects.filter(
-                submission=OuterRef('pk')
-            ).order_by('-date')
-
-            queryset = queryset.annotate(
-                latest_next_usertype=Subquery(latest_status_subquery.values('next_usertype')[:1])
-            )
-
             if usertype not in ["OE", "director"] and not user.is_superuser:
                 queryset = queryset.filter(
                     Q(latest_next_usertype=usertype) | Q(creator=user_profile.user)
                 )
 
-            already_seen = RequestSubmissionStatusHistory.objects.filter(
+            already_seen = RequestAssignment.objects.filter(
                 submission=OuterRef('pk'),
                 usertype=usertype,
-                submitted_users=user_profile
+                processed_by=user_profile
             )
             queryset = queryset.annotate(
                 already_processed=Exists(already_seen)
@@ -116,33 +161,6 @@ class HomeView(mixins.HybridTemplateView):
         else:
             return RequestSubmission.objects.none()
 
-    def get_monthly_stats(self, queryset, date_field):
-        months = []
-        for i in range(6):
-            date = timezone.now().date() - timedelta(days=30*i)
-            month_start = date.replace(day=1)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            count = queryset.filter(**{
-                f'{date_field}__gte': month_start,
-                f'{date_field}__lte': month_end
-            }).count()
-            months.append({'month': month_start.strftime('%b %Y'), 'count': count})
-        return list(reversed(months))
-
-    def get_status_distribution(self, queryset):
-        status_counts = {'on_hold': 0, 'approved': 0, 'rejected': 0}
-        for request in queryset:
-            latest_status = request.status_history.order_by('-date').first()
-            if latest_status:
-                status = latest_status.status
-                if status in status_counts:
-                    status_counts[status] += 1
-                else:
-                    status_counts['on_hold'] += 1
-            else:
-                status_counts['on_hold'] += 1
-        return [{'current_status': status, 'count': count} for status, count in status_counts.items() if count > 0]
-
     def get_usertype_distribution(self, queryset):
         if self.request.user.usertype in ["director", "OE"]:
             return queryset.exclude(is_superuser=True).values('usertype').annotate(
@@ -150,50 +168,20 @@ class HomeView(mixins.HybridTemplateView):
             ).order_by('usertype')
         return queryset.values('usertype').annotate(count=Count('usertype')).order_by('usertype')
 
-    def get_recent_status_changes(self, user):
-        return RequestSubmissionStatusHistory.objects.filter(
-            usertype="director",
-            status__in=["approved", "rejected"]
-        ).select_related('submission', 'user').order_by('-date')[:10]
-
-    def get_avg_processing_time(self, queryset):
-        total_days = 0
-        count = 0
-        for request in queryset:
-            status_history = request.status_history.order_by('date')
-            if status_history.count() >= 2:
-                first_status = status_history.first()
-                last_status = status_history.last()
-                if first_status and last_status:
-                    days = (last_status.date - first_status.date).days
-                    total_days += days
-                    count += 1
-        return round(total_days / count, 1) if count > 0 else 0
-
-    def get_completion_rate(self, queryset):
-        total = queryset.count()
-        if total == 0:
-            return 0
-        completed = sum(
-            1 for request in queryset
-            if request.status_history.order_by('-date').first() and
-               request.status_history.order_by('-date').first().status in ['approved', 'rejected']
-        )
-        return round((completed / total) * 100, 1)
-
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = self.request.user
         context['is_dashboard'] = True
+        # The page only renders the shell, every widget is fetched separately and in parallel by the browser
+        query_string = self.request.GET.urlencode()
+        context['dashboard_widget_urls'] = {
+            widget: reverse('core:dashboard_widget', kwargs={'widget': widget}) + (f'?{query_string}' if query_string else '')
+            for widget in DASHBOARD_WIDGETS
+        }
+        return context
 
-        user_profile, usertype = self.get_user_profile_and_usertype(user)
-        today = timezone.now().date()
-        start_of_month = today.replace(day=1)
-        start_of_week = today - timedelta(days=today.weekday())
-
+    def get_filtered_requests(self, user, user_profile, usertype):
+        """Requests shown on the dashboard of the current user"""
         base_queryset = RequestSubmission.objects.filter(is_active=True)
-        users_qs = User.objects.filter(is_active=True)
-        profiles_qs = UserProfile.objects.filter(is_active=True)
 
         if user.is_superuser:
             filtered_requests = base_queryset
@@ -209,9 +197,8 @@ class HomeView(mixins.HybridTemplateView):
             else:
                 # Other users see requests assigned to them or submitted by them
                 filtered_requests = base_queryset.filter(
-                    Q(status_history__next_usertype=usertype) |
-                    Q(status_history__submitted_users=user_profile)
-                ).distinct().exclude(created_by=user_profile)
+                    id__in=RequestAssignment.visible_to(usertype, user_profile)
+                ).exclude(created_by=user_profile)
                 
                 # Status filter for non-college users
                 status = self.request.GET.get("status", "").lower()
@@ -223,65 +210,45 @@ class HomeView(mixins.HybridTemplateView):
                     filtered_requests = filtered_requests.filter(
                         id__in=oe_to_college_ids,
                         status=status
-                    ).distinct()
+                    )
                 elif status == "processing":
                     filtered_requests = filtered_requests.filter(status="processing")
         else:
             filtered_requests = base_queryset.none()
 
-        total_requests_count = filtered_requests.count()
-        status_counts = self.get_status_counts(filtered_requests)
+        return filtered_requests
 
+    def get_filtered_users(self, user):
+        users_qs = User.objects.filter(is_active=True)
         if user.is_superuser:
-            filtered_users = users_qs
-            filtered_profiles = profiles_qs
-        else:
-            filtered_users = users_qs.filter(id=user.id)
-            filtered_profiles = profiles_qs.filter(user=user)
+            return users_qs
+        return users_qs.filter(id=user.id)
 
-        assigned_requests_count = 0
-        if user_profile and not user.is_superuser:
-            if usertype == "College":
-                # For college users, assigned requests are their own requests
-                assigned_requests_count = base_queryset.filter(
-                    created_by=user_profile
-                ).count()
-            else:
-                # For other users, assigned requests are those assigned to them
-                latest_status_subquery = RequestSubmissionStatusHistory.objects.filter(
-                    submission=OuterRef('pk')
-                ).order_by('-date')
-                assigned_requests_count = base_queryset.annotate(
-                    latest_next_usertype=Subquery(latest_status_subquery.values('next_usertype')[:1])
-                ).filter(
-                    is_active=True,
-                    latest_next_usertype=usertype
-                ).exclude(
-                    created_by=user_profile
-                ).distinct().count()
-
-        context.update({
-            'total_users': UserProfile.objects.exclude(user__is_superuser=True, is_active=True).count(),
-            'active_users': filtered_users.exclude(is_superuser=True).filter(is_active=True).count(),
-            'new_users_this_month': UserProfile.objects.filter(
-                user__is_active=True,
-                user__date_joined__gte=start_of_month
-            ).exclude(user__is_superuser=True).count(),
-            'new_users_this_week': filtered_users.exclude(is_superuser=True).filter(date_joined__gte=start_of_week).count(),
-            'total_profiles': filtered_profiles.count(),
-            'profiles_with_photo': filtered_profiles.exclude(photo='').count(),
-            'profiles_with_mobile': filtered_profiles.exclude(mobile='').count(),
-            'total_requests': total_requests_count,
-            'approved_requests': status_counts['approved'],
-            'rejected_requests': status_counts['rejected'],
-            'pending_requests': status_counts['pending'],
-            'processing_requests': status_counts['processing'],
-            'assigned_requests_count': assigned_requests_count,
-            'my_requests_count': RequestSubmission.objects.filter(created_by=user_profile, is_active=True).count() if user_profile else 0,
-            'my_pending_requests_count': RequestSubmission.objects.filter(created_by=user_profile, is_active=True, status__in=['pending', 'processing']).count() if user_profile else 0,
-            'my_approved_requests_count': RequestSubmission.objects.filter(created_by=user_profile, is_active=True, status='approved').count() if user_profile else 0,
-            'my_rejected_requests_count': RequestSubmission.objects.filter(created_by=user_profile, is_active=True, status='rejected').count() if user_profile else 0,
-        })
+    def get_counters_widget(self):
+        """
+        User and request counters shown on the cards at the top of the dashboard.
+
+        Counters are about the current status of requests, which the rollups (counts of status events) can't tell, so
+        they read the indexed latest status columns of the requests.
+        """
+        context = {}
+        user = self.request.user
+        user_profile, usertype = self.get_user_profile_and_usertype(user)
+        today = timezone.now().date()
+        start_of_month = today.replace(day=1)
+        start_of_week = today - timedelta(days=today.weekday())
+
+        filtered_requests = self.get_filtered_requests(user, user_profile, usertype)
+        context.update(self.get_user_counters(user, start_of_month, start_of_week))
+        context.update(self.get_status_counts(user, user_profile, usertype, filtered_requests))
+        return context
+
+    def get_recent_assigned_widget(self):
+        """Latest requests waiting on the current user, with their dashboard status"""
+        context = {}
+        user = self.request.user
+        user_profile, usertype = self.get_user_profile_and_usertype(user)
+        base_queryset = RequestSubmission.objects.filter(is_active=True)
 
         # Recent assigned requests logic
         recent_assigned_requests = []
@@ -289,103 +256,137 @@ class HomeView(mixins.HybridTemplateView):
             if usertype == "College":
                 assigned_qs = base_queryset.filter(created_by=user_profile)
             else:
-                latest_status_subquery = RequestSubmissionStatusHistory.objects.filter(
-                    submission=OuterRef('pk')
-                ).order_by('-date')
-                assigned_qs = base_queryset.annotate(
-                    latest_next_usertype=Subquery(latest_status_subquery.values('next_usertype')[:1])
-                ).filter(
-                    is_active=True,
+                assigned_qs = base_queryset.filter(
                     latest_next_usertype=usertype
                 ).exclude(created_by=user_profile)
             
-            assigned_qs = assigned_qs.distinct().order_by('-created')
-            
+            latest_assignment_date = RequestSubmissionStatusHistory.objects.filter(
+                submission=OuterRef('pk'),
+                next_usertype=usertype
+            ).order_by('-date').values('date')[:1]
+            assigned_qs = assigned_qs.annotate(
+                latest_assignment_date=Subquery(latest_assignment_date),
+            ).annotate(
+                user_has_processed=Exists(RequestSubmissionStatusHistory.objects.filter(
+                    submission=OuterRef('pk'),
+                    submitted_users=user_profile,
+                    usertype=usertype,
+                    date__gt=OuterRef('latest_assignment_date')
+                )),
+                reassigned=Exists(RequestSubmissionStatusHistory.objects.filter(
+                    submission=OuterRef('pk'),
+                    usertype=usertype
+                ).exclude(next_usertype=usertype)),
+            ).select_related('title').distinct().order_by('-created')
+
             for req in assigned_qs[:10]:  # Limit to 10
-                latest_assignment = req.status_history.filter(next_usertype=usertype).order_by('-date').first()
-                if latest_assignment:
-                    user_has_processed = req.status_history.filter(
-                        submitted_users=user_profile,
-                        usertype=usertype,
-                        date__gt=latest_assignment.date
-                    ).exists()
-                else:
-                    user_has_processed = False
-                reassigned = req.status_history.filter(usertype=usertype).exclude(next_usertype=usertype).exists()
-                req.dashboard_status = 'pending' if user_has_processed or reassigned else 'processing'
+                req.dashboard_status = 'pending' if req.user_has_processed or req.reassigned else 'processing'
                 req.is_created_by_user = (req.created_by_id == user_profile.id)
                 recent_assigned_requests.append(req)
 
-        re_assigned_requests_count = 0
-        if user_profile and not user.is_superuser:
-            director_reassign_qs = RequestSubmissionStatusHistory.objects.filter(
-                submission__current_usertype=usertype,
-                usertype="director",           
-                status="re_assign",             
-                next_usertype=usertype          
-            ).values_list("submission_id", flat=True)
-
-            re_assigned_requests_count = RequestSubmission.objects.filter(
-                id__in=director_reassign_qs,
-                is_active=True
-            ).exclude(created_by=user_profile).distinct().count()
-
         context['recent_assigned_requests'] = recent_assigned_requests
-        context["re_assigned_requests_count"] = re_assigned_requests_count
-        pending_requests = filtered_requests.filter(status__in=['pending', 'processing'])
-        context['pending_requests'] = pending_requests.count()
+        pending_requests = self.get_filtered_requests(user, user_profile, usertype).filter(status__in=['pending', 'processing'])
         context['recent_pending_requests'] = pending_requests.order_by('-created')[:5]
+        return context
 
-        # Other context data (charts, stats, etc.)
-        context['monthly_request_stats'] = self.get_monthly_stats(filtered_requests, 'created')
-        context['status_distribution'] = self.get_status_distribution(filtered_requests)
-        context['usertype_distribution'] = self.get_usertype_distribution(filtered_users)
-        context['recent_status_changes'] = self.get_recent_status_changes(user)
-        context['avg_processing_time'] = self.get_avg_processing_time(filtered_requests)
-        context['completion_rate'] = self.get_completion_rate(filtered_requests)
+    def get_monthly_widget(self):
+        """Monthly request and user series for the line charts"""
+        context = {}
+        user = self.request.user
+        user_profile, usertype = self.get_user_profile_and_usertype(user)
 
+        if user.is_superuser:
+            # Every request is in scope, so the chart is read from the daily rollups instead of scanning requests. A
+            # request counts on the day of its first status event (the day it was created) and stays counted once it
+            # is deactivated. The other scopes follow visibility rules the rollup dimensions don't hold.
+            context['monthly_requests'] = self.get_monthly_stats(RequestStatusRollup.objects.all(), 'day', value=Sum('opened'))
+        else:
+            context['monthly_requests'] = self.get_monthly_stats(self.get_filtered_requests(user, user_profile, usertype), 'created')
+        context['monthly_users'] = self.get_monthly_stats(self.get_filtered_users(user), 'date_joined')
         return context
 
-    
-    def get_monthly_stats(self, queryset, date_field):
-        """Get monthly statistics for the last 6 months"""
-        months = []
-        for i in range(6):
-            date = timezone.now().date() - timedelta(days=30*i)
-            month_start = date.replace(day=1)
-            month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
-            
-            count = queryset.filter(**{
-                f'{date_field}__gte': month_start,
-                f'{date_field}__lte': month_end
-            }).count()
-            
-            months.append({
-                'month': month_start.strftime('%b %Y'),
-                'count': count
-            })
-        
-        return list(reversed(months))
+    def get_status_distribution_widget(self):
+        """Outcome of the requests in scope: status split, completion rate and average processing time"""
+        user = self.request.user
+        user_profile, usertype = self.get_user_profile_and_usertype(user)
+        filtered_requests = self.get_filtered_requests(user, user_profile, usertype)
+        return {
+            'status_distribution': self.get_status_distribution(filtered_requests),
+            'avg_processing_time': self.get_avg_processing_time(filtered_requests),
+            'completion_rate': self.get_completion_rate(filtered_requests),
+        }
+
+    def get_stage_dwell_widget(self):
+        """Median, p90 and p99 time requests spend with each usertype, overall and per college"""
+        user = self.request.user
+        intervals = RequestStageInterval.objects.all()
+        if not user.is_superuser:
+            user_profile, usertype = self.get_user_profile_and_usertype(user)
+            intervals = intervals.filter(submission__in=self.get_filtered_requests(user, user_profile, usertype).values('pk'))
+        stages, colleges = stage_dwell_stats(intervals)
+        return {'stage_dwell': stages, 'stage_dwell_by_college': colleges}
+
+    def get_recent_changes_widget(self):
+        """
+        Latest final decisions of the director, with the approved and rejected counts of the last 7 and 30 days.
+
+        Only the director and superuser dashboards show every decision; other viewers get an empty widget.
+        """
+        if get_dashboard_role(self.request.user) != 'superuser':
+            return {'recent_status_changes': [], 'decision_counts': {}}
+        # Served by the (usertype, status) index of the history
+        decisions = RequestSubmissionStatusHistory.objects.filter(usertype='director', status__in=['approved', 'rejected'])
+        now = timezone.now()
+        last_week, last_month = now - timedelta(days=7), now - timedelta(days=30)
+        return {
+            'recent_status_changes': [
+                {
+                    'request_id': change.submission.request_id,
+                    'title': str(change.submission.title or ''),
+                    'url': str(change.submission.get_absolute_url()),
+                    'status': change.status,
+                    'status_display': change.get_status_display(),
+                    'user': str(change.user or ''),
+                    'date': change.date,
+                }
+                for change in decisions.select_related('submission__title', 'user').order_by('-date')[:10]
+            ],
+            'decision_counts': count_by(
+                decisions.filter(date__gte=last_month),
+                approved_week=Q(status='approved', date__gte=last_week),
+                rejected_week=Q(status='rejected', date__gte=last_week),
+                approved_month=Q(status='approved'),
+                rejected_month=Q(status='rejected'),
+            ),
+        }
+
+    def get_usertype_distribution_widget(self):
+        return {'usertype_distribution': list(self.get_usertype_distribution(self.get_filtered_users(self.request.user)))}
+
+    def get_monthly_stats_window(self):
+        """Number of calendar months shown on the charts, overridable with ?months=6|12|24"""
+        months = self.request.GET.get("months", "")
+        if months.isdigit() and int(months) in MONTHLY_WINDOWS:
+            return int(months)
+        return self.monthly_stats_months
+
+    def get_monthly_stats(self, queryset, date_field, value=None):
+        """Get monthly statistics for the configured window of calendar months"""
+        return monthly_series(queryset, date_field, months=self.get_monthly_stats_window(), value=value)
     
     def get_status_distribution(self, queryset):
         """Get distribution of request statuses from latest status history"""
-        status_counts = {'on_hold': 0, 'approved': 0, 'rejected': 0}
-        
-        for request in queryset:
-            latest_status = request.status_history.order_by('-date').first()
-            if latest_status:
-                status = latest_status.status
-                if status in status_counts:
-                    status_counts[status] += 1
-                else:
-                    status_counts['on_hold'] += 1  # Default to on_hold
-            else:
-                status_counts['on_hold'] += 1
-        
+        status_counts = count_by(
+            RequestSubmission.objects.filter(pk__in=queryset.values('pk')),
+            on_hold=~Q(latest_status__in=['approved', 'rejected']),
+            approved=Q(latest_status='approved'),
+            rejected=Q(latest_status='rejected'),
+        )
+
         return [
-            {'current_status': status, 'count': count}
-            for status, count in status_counts.items()
-            if count > 0
+            {'current_status': status, 'count': status_counts[status]}
+            for status in ('on_hold', 'approved', 'rejected')
+            if status_counts[status] > 0
         ]
     
     def get_usertype_distribution(self, queryset):
@@ -400,44 +401,53 @@ class HomeView(mixins.HybridTemplateView):
                 count=Count('usertype')
             ).order_by('usertype')
     
-    def get_recent_status_changes(self, user):
-        """Get recent status changes: only director, only approved/rejected"""
-        return RequestSubmissionStatusHistory.objects.filter(
-            usertype="director",
-            status__in=["approved", "rejected"]
-        ).select_related('submission', 'user').order_by('-date')[:10]
-    
     def get_avg_processing_time(self, queryset):
-        """Calculate average processing time for requests"""
-        total_days = 0
-        count = 0
-        
-        for request in queryset:
-            status_history = request.status_history.order_by('date')
-            if status_history.count() >= 2:
-                first_status = status_history.first()
-                last_status = status_history.last()
-                
-                if first_status and last_status:
-                    days = (last_status.date - first_status.date).days
-                    total_days += days
-                    count += 1
-        
-        return round(total_days / count, 1) if count > 0 else 0
+        """Calculate average processing time for requests, in days, from their stored stage intervals"""
+        totals = RequestStageInterval.objects.filter(submission__in=queryset.values('pk')).aggregate(
+            seconds=Sum('seconds'),
+            requests=Count('submission', distinct=True),
+        )
+        if not totals['requests']:
+            return 0
+        return round(totals['seconds'] / totals['requests'] / 86400, 1)
     
     def get_completion_rate(self, queryset):
         """Calculate request completion rate"""
-        total = queryset.count()
-        if total == 0:
+        counts = count_by(
+            RequestSubmission.objects.filter(pk__in=queryset.values('pk')),
+            total=Q(),
+            completed=Q(latest_status__in=['approved', 'rejected']),
+        )
+        if counts['total'] == 0:
             return 0
         
-        completed = 0
-        for request in queryset:
-            latest_status = request.status_history.order_by('-date').first()
-            if latest_status and latest_status.status in ['approved', 'rejected']:
-                completed += 1
-        
-        return round((completed / total) * 100, 1)
+        return round((counts['completed'] / counts['total']) * 100, 1)
+
+
+class DashboardWidgetView(HomeView):
+    """
+    A single dashboard widget, cached on its own policy from ``DASHBOARD_WIDGETS``.
+
+    Card widgets render the fragment of the viewer's dashboard layout, chart and feed widgets return their data as JSON.
+    """
+    fragment_widgets = ('counters', 'recent_assigned', 'recent_changes', 'stage_dwell')
+
+    def get(self, request, *args, **kwargs):
+        widget = kwargs['widget']
+        if widget not in DASHBOARD_WIDGETS:
+            raise Http404("Unknown dashboard widget")
+
+        data = get_dashboard_snapshot(request, widget, getattr(self, f'get_{widget}_widget'))
+        if widget == 'stage_dwell' and request.GET.get('_export') in TableExport.FORMATS:
+            return self.export_stage_dwell(data, request.GET['_export'])
+        if widget in self.fragment_widgets:
+            role = get_dashboard_role(request.user)
+            return render(request, [f'app/dashboard/widgets/{role}_{widget}.html', f'app/dashboard/widgets/{widget}.html'], data)
+        return JsonResponse(data)
+
+    def export_stage_dwell(self, data, export_format):
+        rows = [dict(stage, college='All colleges') for stage in data['stage_dwell']] + data['stage_dwell_by_college']
+        return TableExport(export_format, RequestStageDwellTable(rows)).response(f'stage-dwell-times.{export_format}')
 
 
 @login_required
@@ -82,9 +82,10 @@ WSGI_APPLICATION = "jamia_admin_erp.wsgi.application"
 
 
 # Database
+# SQLite goes through core.db.sqlite3, whose transactions wait for each other instead of failing with "database is locked"
 DATABASES = {
     "default": {
-        "ENGINE": config("DB_ENGINE", default="django.db.backends.sqlite3"),
+        "ENGINE": config("DB_ENGINE", default="core.db.sqlite3"),
         "NAME": config("DB_NAME", default=BASE_DIR / "db.sqlite3"),
         "USER": config("DB_USER", default=""),
         "PASSWORD": config("DB_PASSWORD", default=""),
@@ -92,6 +93,11 @@ DATABASES = {
         "PORT": "",
     }
 }
+if DATABASES["default"]["ENGINE"] == "core.db.sqlite3":
+    # Seconds a write waits for the other writers, and a test database in a file so that tests can write from several
+    # connections at once (in-memory databases share one cache, whose table locks fail instead of waiting)
+    DATABASES["default"]["OPTIONS"] = {"timeout": config("DB_TIMEOUT", default=20, cast=int)}
+    DATABASES["default"]["TEST"] = {"NAME": BASE_DIR / "test_db.sqlite3"}
 
 
 # Password validation
@@ -188,6 +194,25 @@ APP_SETTINGS = {
 }
 
 
+# Cache shared by every process of the site: the dashboard and list count caches below keep the version tokens that
+# invalidate them here, so a per-process cache (LocMemCache) would serve stale data from the other processes. The
+# database cache works with any deployment, its table is created by the core migrations ("manage.py createcachetable"
+# recreates it). Use Redis with CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and CACHE_LOCATION=redis://...
+CACHES = {
+    "default": {
+        "BACKEND": config("CACHE_BACKEND", default="django.core.cache.backends.db.DatabaseCache"),
+        "LOCATION": config("CACHE_LOCATION", default="django_cache"),
+    }
+}
+
+# Dashboard snapshots are cached per user and invalidated when request, profile or notification data changes.
+# DASHBOARD_CACHE_TIMEOUT is the lifetime of the widgets without their own timeout in core.dashboard.DASHBOARD_WIDGETS.
+DASHBOARD_CACHE_ENABLED = config("DASHBOARD_CACHE_ENABLED", default=True, cast=bool)
+DASHBOARD_CACHE_TIMEOUT = config("DASHBOARD_CACHE_TIMEOUT", default=300, cast=int)
+
+# Row counts of the list pages are cached per view, filters and user, and invalidated when their models change
+LIST_COUNT_CACHE_TIMEOUT = config("LIST_COUNT_CACHE_TIMEOUT", default=60, cast=int)
+
 THUMBNAIL_ALIASES = {'': {'avatar': {'size': (50, 50), 'crop': True}}}
 
 GRAPH_MODELS = {'all_applications': True, 'group_models': True}
@@ -201,4 +226,12 @@ EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD")
 
 # --- Brevo (Sendinblue) Email Settings ---
 BREVO_API_KEY = config("BREVO_API_KEY")
-DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL")
\ No newline at end of file
+# API root, the SDK's default when unset
+BREVO_API_URL = config("BREVO_API_URL", default=None)
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL")
+
+# Notification e-mails are queued in core.models.EmailOutbox and sent by "manage.py run_email_worker"
+EMAIL_OUTBOX_TRANSPORT = config("EMAIL_OUTBOX_TRANSPORT", default="core.outbox.BrevoTransport")
+EMAIL_OUTBOX_MAX_ATTEMPTS = config("EMAIL_OUTBOX_MAX_ATTEMPTS", default=6, cast=int)
+# Seconds before the first retry, doubling with every further attempt
+EMAIL_OUTBOX_RETRY_DELAY = config("EMAIL_OUTBOX_RETRY_DELAY", default=60, cast=int)
@@ -4,6 +4,7 @@ from users.models import UserProfile
 from .models import Memo, RequestSubmission, USERTYPE_CHOICES, RequestSubmissionStatusHistory, RequestSubmissionType
 from django.contrib.auth import get_user_model
 from tinymce.widgets import TinyMCE 
+from .workflow import BULK_ACTION_LIMIT, BULK_DECISIONS
 
 User = get_user_model()
 
@@ -118,7 +119,42 @@ class RequestStatusUpdateForm(forms.ModelForm):
             self.add_error("request_shared_usertype", "Please select at least one usertype to share the request with.")
 
         return cleaned_data
-    
+
+
+class RequestIdListField(forms.Field):
+    widget = forms.MultipleHiddenInput
+
+    def to_python(self, value):
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in value or ()))
+        except (TypeError, ValueError):
+            raise forms.ValidationError("Enter a list of request ids.")
+        if len(ids) > BULK_ACTION_LIMIT:
+            raise forms.ValidationError(f"Select at most {BULK_ACTION_LIMIT} requests at a time.")
+        return ids
+
+
+class RequestBulkActionForm(forms.Form):
+    ids = RequestIdListField(label="Requests")
+    status = forms.ChoiceField(choices=(), label="Status")
+    remark = forms.CharField(required=False, label="Remark")
+    reassign_usertype = forms.ChoiceField(choices=USERTYPE_CHOICES, required=False, label="Reassign To")
+
+    def __init__(self, *args, **kwargs):
+        self.usertype = kwargs.pop('usertype', None)
+        super().__init__(*args, **kwargs)
+
+        # Same fields as the status update form: only director decides, OE always leaves a remark
+        if self.usertype == "director":
+            status_labels = dict(REQUEST_STATUS_CHOICES)
+            self.fields["status"].choices = [(status, status_labels[status]) for status in BULK_DECISIONS["director"]]
+        else:
+            self.fields.pop("status")
+            self.fields.pop("reassign_usertype")
+        if self.usertype == "OE":
+            self.fields["remark"].required = True
+
+
 class RequestSubmissionTypeForm(forms.ModelForm):
     class Meta:
         model = RequestSubmissionType
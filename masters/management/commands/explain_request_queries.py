@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+from django.db import connection
+
+from masters.models import RequestSubmission
+from masters.models import RequestSubmissionStatusHistory
+from users.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the query plan and average run time of the request and status history access patterns used by the "
+        "dashboard and list views. Run it before and after migrating masters 0017 to compare the indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--usertype", default="OE", help="Usertype whose assigned requests are queried (default: OE).")
+        parser.add_argument("--repeat", type=int, default=20, help="Number of timed runs of every query (default: 20).")
+        parser.add_argument("--no-plan", action="store_true", help="Only print the timings.")
+
+    def get_querysets(self, usertype):
+        submission = RequestSubmission.objects.order_by("-pk").first()
+        profile = UserProfile.objects.filter(user__usertype=usertype).first() or UserProfile.objects.first()
+        college = RequestSubmission.objects.values_list("created_by", flat=True).first()
+        if submission is None or profile is None:
+            raise CommandError("There are no requests to run the queries against.")
+
+        history = RequestSubmissionStatusHistory.objects.all()
+        requests = RequestSubmission.objects.all()
+        return {
+            "history of a request (submission, -date)": history.filter(submission=submission).order_by("-date"),
+            "assignments to a usertype (next_usertype, date)": history.filter(next_usertype=usertype).order_by("-date")[:50],
+            "decisions by usertype and status (usertype, status)": history.filter(usertype="OE", status="re_assign").values("submission_id"),
+            "reassignments away from a usertype (usertype, next_usertype)": history.filter(usertype=usertype).exclude(next_usertype=usertype).values("submission_id"),
+            "director decisions (partial, -date)": history.filter(usertype="director", status__in=["approved", "rejected"]).order_by("-date")[:10],
+            "requests handled by a profile (submitted_users)": history.filter(submitted_users=profile).values("submission_id"),
+            "requests by status (status, is_active, -updated)": requests.filter(status="pending", is_active=True).order_by("-updated")[:50],
+            "requests of a college (created_by, is_active, status)": requests.filter(created_by=college, is_active=True, status="approved"),
+            "requests waiting on a usertype (partial, latest_next_usertype, -created)": requests.filter(is_active=True, latest_next_usertype=usertype).order_by("-created")[:10],
+        }
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Database: {connection.vendor}")
+        for name, queryset in self.get_querysets(options["usertype"]).items():
+            started = time.perf_counter()
+            for _ in range(options["repeat"]):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - started) / options["repeat"] * 1000
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{name}: {elapsed:.2f} ms"))
+            if not options["no_plan"]:
+                self.stdout.write(queryset.explain())
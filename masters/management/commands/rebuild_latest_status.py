@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from masters.models import RequestSubmission
+
+
+class Command(BaseCommand):
+    help = "Rebuild the latest status columns of request submissions from their status history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("ids", nargs="*", type=int, help="Only rebuild these request submission ids.")
+
+    def handle(self, *args, **options):
+        queryset = RequestSubmission.objects.all()
+        if options["ids"]:
+            queryset = queryset.filter(pk__in=options["ids"])
+        updated = RequestSubmission.rebuild_latest_status(queryset)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt latest status for {updated} request submissions."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from masters.models import RequestAssignment
+
+
+class Command(BaseCommand):
+    help = "Rebuild the request assignments behind the assigned and processed request lists from the status history."
+
+    def handle(self, *args, **options):
+        rows = RequestAssignment.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} request assignments."))
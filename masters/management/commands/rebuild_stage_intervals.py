@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+from masters.models import RequestStageInterval
+
+
+class Command(BaseCommand):
+    help = "Rebuild the request stage intervals used by the dwell-time analytics from the status history."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Only rebuild stages that ended on this date or later (YYYY-MM-DD). Rebuilds everything when omitted.")
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        if since:
+            try:
+                since = date.fromisoformat(since)
+            except ValueError:
+                raise CommandError(f"Invalid --since date '{since}', expected YYYY-MM-DD.")
+        rows = RequestStageInterval.rebuild(since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} request stage intervals."))
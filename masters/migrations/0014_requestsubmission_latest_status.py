@@ -0,0 +1,76 @@
+# Generated by Django 4.2 on 2026-10-18 07:34
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def backfill_latest_status(apps, schema_editor):
+    RequestSubmission = apps.get_model("masters", "RequestSubmission")
+    RequestSubmissionStatusHistory = apps.get_model("masters", "RequestSubmissionStatusHistory")
+    latest = RequestSubmissionStatusHistory.objects.filter(submission=OuterRef("pk")).order_by("-date", "-pk")
+    RequestSubmission.objects.update(
+        latest_status=Subquery(latest.values("status")[:1]),
+        latest_next_usertype=Subquery(latest.values("next_usertype")[:1]),
+        latest_history=Subquery(latest.values("pk")[:1]),
+        latest_history_at=Subquery(latest.values("date")[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0013_alter_requestsubmission_college'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='historicalrequestsubmission',
+            options={'get_latest_by': ('history_date', 'history_id'), 'ordering': ('-history_date', '-history_id'), 'verbose_name': 'historical Request Submission', 'verbose_name_plural': 'historical Request Submissions'},
+        ),
+        migrations.AlterModelOptions(
+            name='requestsubmission',
+            options={'ordering': ['-updated'], 'verbose_name': 'Request Submission', 'verbose_name_plural': 'Request Submissions'},
+        ),
+        migrations.AddField(
+            model_name='historicalrequestsubmission',
+            name='latest_history',
+            field=models.ForeignKey(blank=True, db_constraint=False, editable=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='masters.requestsubmissionstatushistory'),
+        ),
+        migrations.AddField(
+            model_name='historicalrequestsubmission',
+            name='latest_history_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalrequestsubmission',
+            name='latest_next_usertype',
+            field=models.CharField(blank=True, choices=[('CRO', 'Community Relation Officer'), ('OE', 'Office Executive'), ('PRO', 'Public Relation Officer'), ('CAO', 'Chief Academic Officer'), ('director', 'Director'), ('AC', 'Admin Coordinator'), ('AA', 'Assistant Administrator'), ('FO', 'Finance Officer'), ('College', 'College')], editable=False, max_length=30, null=True),
+        ),
+        migrations.AddField(
+            model_name='historicalrequestsubmission',
+            name='latest_status',
+            field=models.CharField(blank=True, choices=[('forwarded', 'Forwarded'), ('re_assign', 'Re Assign'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('pending', 'Pending')], editable=False, max_length=30, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestsubmission',
+            name='latest_history',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='masters.requestsubmissionstatushistory'),
+        ),
+        migrations.AddField(
+            model_name='requestsubmission',
+            name='latest_history_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestsubmission',
+            name='latest_next_usertype',
+            field=models.CharField(blank=True, choices=[('CRO', 'Community Relation Officer'), ('OE', 'Office Executive'), ('PRO', 'Public Relation Officer'), ('CAO', 'Chief Academic Officer'), ('director', 'Director'), ('AC', 'Admin Coordinator'), ('AA', 'Assistant Administrator'), ('FO', 'Finance Officer'), ('College', 'College')], editable=False, max_length=30, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestsubmission',
+            name='latest_status',
+            field=models.CharField(blank=True, choices=[('forwarded', 'Forwarded'), ('re_assign', 'Re Assign'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('pending', 'Pending')], editable=False, max_length=30, null=True),
+        ),
+        migrations.RunPython(backfill_latest_status, migrations.RunPython.noop),
+    ]
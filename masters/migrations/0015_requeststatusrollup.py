@@ -0,0 +1,32 @@
+# Generated by Django 4.2 on 2026-10-18 07:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('masters', '0014_requestsubmission_latest_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestStatusRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('usertype', models.CharField(choices=[('CRO', 'Community Relation Officer'), ('OE', 'Office Executive'), ('PRO', 'Public Relation Officer'), ('CAO', 'Chief Academic Officer'), ('director', 'Director'), ('AC', 'Admin Coordinator'), ('AA', 'Assistant Administrator'), ('FO', 'Finance Officer'), ('College', 'College')], max_length=30)),
+                ('status', models.CharField(choices=[('forwarded', 'Forwarded'), ('re_assign', 'Re Assign'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('pending', 'Pending')], max_length=20)),
+                ('events', models.PositiveIntegerField(default=0)),
+                ('opened', models.PositiveIntegerField(default=0, verbose_name='Requests opened')),
+                ('dwell_seconds', models.BigIntegerField(default=0, verbose_name='Total dwell time (seconds)')),
+                ('college', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='users.userprofile')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'unique_together': {('day', 'college', 'usertype', 'status')},
+            },
+        ),
+    ]
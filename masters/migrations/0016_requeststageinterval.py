@@ -0,0 +1,64 @@
+# Generated by Django 4.2 on 2026-10-18 07:49
+
+from django.db import migrations, models
+from django.db.models import F, Window
+from django.db.models.functions import Lag
+import django.db.models.deletion
+
+
+def backfill_stage_intervals(apps, schema_editor):
+    RequestStageInterval = apps.get_model("masters", "RequestStageInterval")
+    RequestSubmissionStatusHistory = apps.get_model("masters", "RequestSubmissionStatusHistory")
+    order = [F("date").asc(), F("pk").asc()]
+    rows = RequestSubmissionStatusHistory.objects.annotate(
+        previous_date=Window(Lag("date"), partition_by=[F("submission_id")], order_by=order),
+        previous_usertype=Window(Lag("next_usertype"), partition_by=[F("submission_id")], order_by=order),
+    ).values_list("pk", "submission_id", "submission__college_id", "date", "previous_date", "previous_usertype").order_by()
+    RequestStageInterval.objects.bulk_create(
+        [
+            RequestStageInterval(
+                history_id=pk,
+                submission_id=submission_id,
+                college_id=college_id,
+                usertype=previous_usertype,
+                started_at=previous_date,
+                ended_at=date,
+                seconds=int((date - previous_date).total_seconds()),
+            )
+            for pk, submission_id, college_id, date, previous_date, previous_usertype in rows.iterator(chunk_size=2000)
+            if previous_date is not None
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('masters', '0015_requeststatusrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestStageInterval',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usertype', models.CharField(choices=[('CRO', 'Community Relation Officer'), ('OE', 'Office Executive'), ('PRO', 'Public Relation Officer'), ('CAO', 'Chief Academic Officer'), ('director', 'Director'), ('AC', 'Admin Coordinator'), ('AA', 'Assistant Administrator'), ('FO', 'Finance Officer'), ('College', 'College')], max_length=30, verbose_name='Stage')),
+                ('started_at', models.DateTimeField()),
+                ('ended_at', models.DateTimeField()),
+                ('seconds', models.BigIntegerField(verbose_name='Dwell time (seconds)')),
+                ('college', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='users.userprofile')),
+                ('history', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stage_interval', to='masters.requestsubmissionstatushistory')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stage_intervals', to='masters.requestsubmission')),
+            ],
+            options={
+                'ordering': ['-ended_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='requeststageinterval',
+            index=models.Index(fields=['usertype', 'college', 'seconds'], name='masters_req_usertyp_bc158a_idx'),
+        ),
+        migrations.RunPython(backfill_stage_intervals, migrations.RunPython.noop),
+    ]
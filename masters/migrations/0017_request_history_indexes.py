@@ -0,0 +1,41 @@
+# Generated by Django 4.2 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0016_requeststageinterval'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='requestsubmission',
+            index=models.Index(fields=['status', 'is_active', '-updated'], name='masters_req_status_164abb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestsubmission',
+            index=models.Index(fields=['created_by', 'is_active', 'status'], name='masters_req_created_d03f9c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestsubmission',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['latest_next_usertype', '-created'], name='request_active_assigned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestsubmissionstatushistory',
+            index=models.Index(fields=['submission', '-date'], name='masters_req_submiss_a7d6d0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestsubmissionstatushistory',
+            index=models.Index(fields=['next_usertype', 'date'], name='masters_req_next_us_fd1948_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestsubmissionstatushistory',
+            index=models.Index(fields=['usertype', 'status'], name='masters_req_usertyp_8f51f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestsubmissionstatushistory',
+            index=models.Index(fields=['usertype', 'next_usertype'], name='masters_req_usertyp_fc36b9_idx'),
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2 on 2026-10-18 08:06
+
+from itertools import groupby
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_request_assignments(apps, schema_editor):
+    RequestAssignment = apps.get_model("masters", "RequestAssignment")
+    RequestSubmissionStatusHistory = apps.get_model("masters", "RequestSubmissionStatusHistory")
+    assignments = []
+    rows = RequestSubmissionStatusHistory.objects.order_by("submission_id", "date", "pk").values_list("submission_id", "usertype", "next_usertype", "user_id", "date")
+    for submission_id, history_rows in groupby(rows.iterator(chunk_size=2000), key=lambda row: row[0]):
+        open_assignments = {}
+        for index, (_, usertype, next_usertype, user_id, date) in enumerate(history_rows):
+            if index:
+                assignment = open_assignments.pop(usertype, None)
+                if assignment is None:
+                    assignment = RequestAssignment(submission_id=submission_id, usertype=usertype, assigned_at=date)
+                    assignments.append(assignment)
+                assignment.closed_at, assignment.processed_by_id = date, user_id
+            if next_usertype and next_usertype not in open_assignments:
+                open_assignments[next_usertype] = RequestAssignment(submission_id=submission_id, usertype=next_usertype, assigned_at=date)
+                assignments.append(open_assignments[next_usertype])
+    RequestAssignment.objects.bulk_create(assignments, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('masters', '0017_request_history_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestAssignment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('usertype', models.CharField(choices=[('CRO', 'Community Relation Officer'), ('OE', 'Office Executive'), ('PRO', 'Public Relation Officer'), ('CAO', 'Chief Academic Officer'), ('director', 'Director'), ('AC', 'Admin Coordinator'), ('AA', 'Assistant Administrator'), ('FO', 'Finance Officer'), ('College', 'College')], max_length=30)),
+                ('assigned_at', models.DateTimeField()),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('processed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='processed_assignments', to='users.userprofile')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='masters.requestsubmission')),
+            ],
+            options={
+                'ordering': ['-assigned_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='requestassignment',
+            index=models.Index(fields=['usertype', 'submission'], name='masters_req_usertyp_05a86a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestassignment',
+            index=models.Index(fields=['processed_by', 'submission'], name='masters_req_process_558e8b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='requestassignment',
+            index=models.Index(condition=models.Q(('closed_at', None)), fields=['usertype', '-assigned_at'], name='request_assignment_open_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='requestassignment',
+            constraint=models.UniqueConstraint(condition=models.Q(('closed_at', None)), fields=('submission', 'usertype'), name='request_assignment_one_open'),
+        ),
+        migrations.RunPython(backfill_request_assignments, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 08:51
+
+import re
+
+from django.db import migrations
+
+
+REQUEST_PREFIX = "REQ"
+
+
+def seed_request_sequence(apps, schema_editor):
+    """Continue the request id sequence after the highest existing REQ number."""
+    DocumentSequence = apps.get_model("core", "DocumentSequence")
+    RequestSubmission = apps.get_model("masters", "RequestSubmission")
+    pattern = re.compile(rf"^{REQUEST_PREFIX}(\d+)$")
+    request_ids = RequestSubmission.objects.filter(request_id__startswith=REQUEST_PREFIX).values_list("request_id", flat=True)
+    last_number = max((int(match.group(1)) for match in map(pattern.match, request_ids.iterator(chunk_size=2000)) if match), default=0)
+    if last_number:
+        DocumentSequence.objects.update_or_create(prefix=REQUEST_PREFIX, year=0, defaults={"last_number": last_number})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_documentsequence'),
+        ('masters', '0018_requestassignment'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_request_sequence, migrations.RunPython.noop),
+    ]
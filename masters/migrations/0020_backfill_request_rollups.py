@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-18 09:08
+
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import F, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+
+def backfill_request_rollups(apps, schema_editor):
+    """Fill the rollups from the existing status history, as ``RequestStatusRollup.rebuild()`` does."""
+    RequestStatusRollup = apps.get_model("masters", "RequestStatusRollup")
+    RequestSubmissionStatusHistory = apps.get_model("masters", "RequestSubmissionStatusHistory")
+    rows = RequestSubmissionStatusHistory.objects.annotate(
+        previous_date=Window(Lag("date"), partition_by=[F("submission_id")], order_by=[F("date").asc(), F("pk").asc()])
+    ).values_list("date", "previous_date", "submission__college_id", "usertype", "status").order_by()
+
+    totals = defaultdict(lambda: [0, 0, 0])
+    for date, previous_date, college_id, usertype, status in rows.iterator(chunk_size=2000):
+        total = totals[(timezone.localdate(date), college_id, usertype, status)]
+        total[0] += 1
+        total[1] += int(previous_date is None)
+        total[2] += int((date - previous_date).total_seconds()) if previous_date else 0
+
+    RequestStatusRollup.objects.all().delete()
+    RequestStatusRollup.objects.bulk_create(
+        [
+            RequestStatusRollup(day=day, college_id=college_id, usertype=usertype, status=status, events=events, opened=opened, dwell_seconds=dwell)
+            for (day, college_id, usertype, status), (events, opened, dwell) in totals.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masters', '0019_request_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_request_rollups, migrations.RunPython.noop),
+    ]
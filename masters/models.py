@@ -1,25 +1,35 @@
+from collections import defaultdict
+from datetime import datetime
+from datetime import time
+from itertools import groupby
+
+from django.db import IntegrityError
 from django.db import models
+from django.db import transaction
 from tinymce.models import HTMLField
 from core.base import BaseModel
 from django.urls import reverse_lazy
+from django.db.models import Case
+from django.db.models import F
+from django.db.models import OuterRef
 from django.db.models import Q
+from django.db.models import Subquery
+from django.db.models import Value
+from django.db.models import When
+from django.db.models import Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
 from users.models import UserProfile
+from core.sequences import next_document_number
 from core.choices import USERTYPE_CHOICES, REQUEST_SUBMISSION_STATUS_CHOICES, CHOICES
 
 
-def generate_request_submission_no(prefix="REQ"):
-    last_request = RequestSubmission.objects.filter(request_id__startswith=prefix).order_by('-request_id').first()
+def generate_request_submission_no():
+    return next_document_number("request")
 
-    if last_request and last_request.request_id:
-        try:
-            last_id = int(last_request.request_id.replace(prefix, ""))
-            next_id = last_id + 1
-        except ValueError:
-            next_id = 1
-    else:
-        next_id = 1
 
-    return f"{prefix}{str(next_id).zfill(4)}"
+LATEST_STATUS_FIELDS = ["latest_status", "latest_next_usertype", "latest_history", "latest_history_at"]
 
 
 class RequestSubmissionType(BaseModel):
@@ -60,6 +70,15 @@ class RequestSubmission(BaseModel):
     created_by = models.ForeignKey("users.UserProfile", on_delete=models.SET_NULL, null=True, blank=True, related_name="created_submissions")
     updated_by = models.ForeignKey("users.UserProfile", on_delete=models.SET_NULL, null=True, blank=True, related_name="updated_submissions")
 
+    # Projection of the most recent status history row, maintained by RequestSubmissionStatusHistory.save()
+    latest_status = models.CharField(max_length=30, choices=REQUEST_SUBMISSION_STATUS_CHOICES, null=True, blank=True, editable=False)
+    latest_next_usertype = models.CharField(max_length=30, choices=USERTYPE_CHOICES, null=True, blank=True, editable=False)
+    latest_history = models.ForeignKey("masters.RequestSubmissionStatusHistory", on_delete=models.SET_NULL, null=True, blank=True, editable=False, related_name="+")
+    latest_history_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    # Relations read by __str__, joined by the lists that render requests (see core.related)
+    str_select_related = ("title",)
+
     def __str__(self):
         return f"{self.title}"
     
@@ -67,12 +86,31 @@ class RequestSubmission(BaseModel):
         ordering = ['-updated']
         verbose_name = "Request Submission"
         verbose_name_plural = "Request Submissions"
+        indexes = [
+            models.Index(fields=["status", "is_active", "-updated"]),
+            models.Index(fields=["created_by", "is_active", "status"]),
+            # Requests waiting on a usertype, newest first: dashboard assigned lists and ?assigned=true
+            models.Index(fields=["latest_next_usertype", "-created"], condition=Q(is_active=True), name="request_active_assigned_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.request_id:
             self.request_id = generate_request_submission_no()
         super().save(*args, **kwargs)
 
+    @classmethod
+    def rebuild_latest_status(cls, queryset=None):
+        """Recompute the latest status columns from the status history in a single UPDATE."""
+        if queryset is None:
+            queryset = cls.objects.all()
+        latest = RequestSubmissionStatusHistory.objects.filter(submission=OuterRef("pk")).order_by("-date", "-pk")
+        return queryset.update(
+            latest_status=Subquery(latest.values("status")[:1]),
+            latest_next_usertype=Subquery(latest.values("next_usertype")[:1]),
+            latest_history=Subquery(latest.values("pk")[:1]),
+            latest_history_at=Subquery(latest.values("date")[:1]),
+        )
+
     @property
     def director_status(self):
         director_status = self.status_history.filter(usertype="director").order_by("-date").first()
@@ -83,28 +121,8 @@ class RequestSubmission(BaseModel):
         oe_status = self.status_history.filter(usertype="OE").order_by("-date").first()
         return oe_status.status if oe_status else "Pending"
 
-    @property
-    def is_approved_or_rejected_for_current_user(self):
-        """Check if OE approved/rejected and assigned to the logged-in usertype."""
-        from django.middleware import get_current_request
-
-        request = get_current_request()
-        if not request or not hasattr(request.user, "profile"):
-            return False
-
-        user_profile = request.user.profile
-        return self.status in ['approved', 'rejected'] and RequestSubmissionStatusHistory.objects.filter(
-            submission=self,
-            usertype='OE',
-            next_usertype=user_profile.user.usertype,
-        ).exists()
-
     def is_processed_by(self, user_profile):
-        return RequestSubmissionStatusHistory.objects.filter(
-            submission=self,
-            usertype=user_profile.user.usertype,
-            submitted_users=user_profile
-        ).exists()
+        return self.assignments.filter(usertype=user_profile.user.usertype, processed_by=user_profile).exists()
 
     def get_list_url(self):
         return reverse_lazy("masters:my_request_submission_list")
@@ -118,22 +136,18 @@ class RequestSubmission(BaseModel):
     def get_delete_url(self):
         return reverse_lazy("masters:request_submission_delete", kwargs={"pk": self.pk})
 
+    def get_workflow(self, acted=()):
+        """Transition table of the request from its latest status history row, see ``masters.workflow.Workflow``."""
+        from .workflow import compile_workflow
+
+        latest = self.latest_history
+        return compile_workflow(self.usertype_flow, latest and latest.usertype, latest and latest.status, acted)
+
     def get_next_user_in_flow(self, current_user_usertype=None):
         if not self.usertype_flow:
             return None
-
-        submitted_usertypes = self.status_history.values_list('usertype', flat=True)
-
-        # Handle normal flow
-        try:
-            current_index = self.usertype_flow.index(current_user_usertype)
-            for next_usertype in self.usertype_flow[current_index + 1:]:
-                if next_usertype not in submitted_usertypes:
-                    return next_usertype
-        except ValueError:
-            pass
-
-        return None
+        submitted_usertypes = self.status_history.values_list("usertype", flat=True).order_by().distinct()
+        return self.get_workflow(acted=submitted_usertypes).next_pending_usertype(current_user_usertype)
 
 
 class RequestSubmissionStatusHistory(BaseModel):
@@ -148,10 +162,339 @@ class RequestSubmissionStatusHistory(BaseModel):
 
     class Meta:
         ordering = ["-date"]
+        indexes = [
+            models.Index(fields=["submission", "-date"]),
+            models.Index(fields=["next_usertype", "date"]),
+            models.Index(fields=["usertype", "status"]),
+            models.Index(fields=["usertype", "next_usertype"]),
+        ]
+
+    # Relations read by __str__, joined by the lists that render status history rows (see core.related)
+    str_select_related = ("submission__title",)
 
     def __str__(self):
         return f"{self.submission.title} - {self.usertype} - {self.status}"
 
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            if adding:
+                college_id, previous_date, previous_usertype = (
+                    RequestSubmission.objects.select_for_update().values_list("college_id", "latest_history_at", "latest_next_usertype").get(pk=self.submission_id)
+                )
+            super().save(*args, **kwargs)
+            RequestSubmission.rebuild_latest_status(RequestSubmission.objects.filter(pk=self.submission_id))
+            if adding:
+                RequestStatusRollup.record(timezone.localdate(self.date), college_id, self.usertype, self.status, self.date, previous_date)
+                if previous_date:
+                    RequestStageInterval.record(self, college_id, previous_usertype, previous_date)
+                RequestAssignment.record(self, processed=previous_date is not None)
+        if RequestSubmissionStatusHistory.submission.is_cached(self):
+            self.submission.refresh_from_db(fields=LATEST_STATUS_FIELDS)
+
+    @classmethod
+    def create_many(cls, histories, default_user=None):
+        """
+        Insert new status history rows, at most one per request, and maintain the same projections as ``save()`` in a
+        fixed number of queries. No signals are sent, callers invalidate what the rows change.
+        """
+        with transaction.atomic():
+            submission_ids = [history.submission_id for history in histories]
+            previous = {
+                pk: (college_id, previous_date, previous_usertype)
+                for pk, college_id, previous_date, previous_usertype in RequestSubmission.objects.select_for_update()
+                .filter(pk__in=submission_ids)
+                .values_list("pk", "college_id", "latest_history_at", "latest_next_usertype")
+            }
+            histories = bulk_create_with_history(histories, cls, batch_size=500, default_user=default_user)
+            RequestSubmission.rebuild_latest_status(RequestSubmission.objects.filter(pk__in=submission_ids))
+
+            rows = [(history, *previous[history.submission_id]) for history in histories]
+            RequestStatusRollup.record_many(
+                (timezone.localdate(history.date), college_id, history.usertype, history.status, history.date, previous_date)
+                for history, college_id, previous_date, _ in rows
+            )
+            RequestStageInterval.record_many(
+                (history, college_id, previous_usertype, previous_date) for history, college_id, previous_date, previous_usertype in rows if previous_date
+            )
+            RequestAssignment.record_many((history, previous_date is not None) for history, _, previous_date, _ in rows)
+        return histories
+
+
+class RequestStatusRollup(models.Model):
+    """Daily totals of status history events per college, acting usertype and status."""
+
+    day = models.DateField()
+    college = models.ForeignKey("users.UserProfile", on_delete=models.PROTECT, related_name="+")
+    usertype = models.CharField(max_length=30, choices=USERTYPE_CHOICES)
+    status = models.CharField(max_length=20, choices=REQUEST_SUBMISSION_STATUS_CHOICES)
+    events = models.PositiveIntegerField(default=0)
+    opened = models.PositiveIntegerField("Requests opened", default=0)
+    dwell_seconds = models.BigIntegerField("Total dwell time (seconds)", default=0)
+
+    class Meta:
+        ordering = ["-day"]
+        unique_together = ("day", "college", "usertype", "status")
+
+    def __str__(self):
+        return f"{self.day} - {self.usertype} - {self.status}"
+
+    @classmethod
+    def record(cls, day, college_id, usertype, status, date, previous_date=None):
+        """Add one status history event to its rollup row, counting the wait since ``previous_date`` as dwell time."""
+        cls.record_many([(day, college_id, usertype, status, date, previous_date)])
+
+    @classmethod
+    def record_many(cls, events):
+        """Add ``(day, college_id, usertype, status, date, previous_date)`` events, with one upsert per rollup row they touch."""
+        totals = defaultdict(lambda: [0, 0, 0])
+        for day, college_id, usertype, status, date, previous_date in events:
+            total = totals[(day, college_id, usertype, status)]
+            total[0] += 1
+            total[1] += int(previous_date is None)
+            total[2] += int((date - previous_date).total_seconds()) if previous_date else 0
+
+        for (day, college_id, usertype, status), (count, opened, dwell) in totals.items():
+            key = {"day": day, "college_id": college_id, "usertype": usertype, "status": status}
+            increments = {"events": F("events") + count, "opened": F("opened") + opened, "dwell_seconds": F("dwell_seconds") + dwell}
+            if cls.objects.filter(**key).update(**increments):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(**key, events=count, opened=opened, dwell_seconds=dwell)
+            except IntegrityError:
+                cls.objects.filter(**key).update(**increments)
+
+    @classmethod
+    def rebuild(cls, since=None):
+        """Recompute the rollup rows from ``since`` (a date) onwards, or all of them, from the status history."""
+        history = RequestSubmissionStatusHistory.objects.annotate(
+            previous_date=Window(Lag("date"), partition_by=[F("submission_id")], order_by=[F("date").asc(), F("pk").asc()])
+        )
+        if since:
+            since_date = timezone.make_aware(datetime.combine(since, time.min))
+            history = history.filter(submission__in=RequestSubmissionStatusHistory.objects.filter(date__gte=since_date).values("submission_id"))
+
+        totals = defaultdict(lambda: [0, 0, 0])
+        rows = history.values_list("date", "previous_date", "submission__college_id", "usertype", "status").order_by()
+        for date, previous_date, college_id, usertype, status in rows.iterator(chunk_size=2000):
+            day = timezone.localdate(date)
+            if since and day < since:
+                continue
+            total = totals[(day, college_id, usertype, status)]
+            total[0] += 1
+            total[1] += int(previous_date is None)
+            total[2] += int((date - previous_date).total_seconds()) if previous_date else 0
+
+        with transaction.atomic():
+            (cls.objects.filter(day__gte=since) if since else cls.objects.all()).delete()
+            cls.objects.bulk_create(
+                [
+                    cls(day=day, college_id=college_id, usertype=usertype, status=status, events=events, opened=opened, dwell_seconds=dwell)
+                    for (day, college_id, usertype, status), (events, opened, dwell) in totals.items()
+                ],
+                batch_size=1000,
+            )
+        return len(totals)
+
+
+class RequestStageInterval(models.Model):
+    """Time a request spent with one usertype, from the status change that sent it there to the one that moved it on."""
+
+    history = models.OneToOneField(RequestSubmissionStatusHistory, on_delete=models.CASCADE, related_name="stage_interval")
+    submission = models.ForeignKey(RequestSubmission, on_delete=models.CASCADE, related_name="stage_intervals")
+    college = models.ForeignKey("users.UserProfile", on_delete=models.PROTECT, related_name="+")
+    usertype = models.CharField("Stage", max_length=30, choices=USERTYPE_CHOICES)
+    started_at = models.DateTimeField()
+    ended_at = models.DateTimeField()
+    seconds = models.BigIntegerField("Dwell time (seconds)")
+
+    class Meta:
+        ordering = ["-ended_at"]
+        indexes = [models.Index(fields=["usertype", "college", "seconds"])]
+
+    def __str__(self):
+        return f"{self.submission_id} - {self.usertype} - {self.seconds}s"
+
+    @classmethod
+    def record(cls, history, college_id, usertype, started_at):
+        """Store the stage closed by ``history``: the request waited with ``usertype`` since ``started_at``."""
+        return cls.objects.create(
+            history=history,
+            submission_id=history.submission_id,
+            college_id=college_id,
+            usertype=usertype,
+            started_at=started_at,
+            ended_at=history.date,
+            seconds=int((history.date - started_at).total_seconds()),
+        )
+
+    @classmethod
+    def record_many(cls, stages):
+        """Store the stages of ``(history, college_id, usertype, started_at)`` tuples, see ``record()``."""
+        return cls.objects.bulk_create(
+            [
+                cls(
+                    history=history,
+                    submission_id=history.submission_id,
+                    college_id=college_id,
+                    usertype=usertype,
+                    started_at=started_at,
+                    ended_at=history.date,
+                    seconds=int((history.date - started_at).total_seconds()),
+                )
+                for history, college_id, usertype, started_at in stages
+            ],
+            batch_size=1000,
+        )
+
+    @classmethod
+    def rebuild(cls, since=None):
+        """Recompute the stages that ended on ``since`` (a date) or later, or all of them, in one pass over the status history."""
+        order = [F("date").asc(), F("pk").asc()]
+        history = RequestSubmissionStatusHistory.objects.annotate(
+            previous_date=Window(Lag("date"), partition_by=[F("submission_id")], order_by=order),
+            previous_usertype=Window(Lag("next_usertype"), partition_by=[F("submission_id")], order_by=order),
+        )
+        since_date = None
+        if since:
+            since_date = timezone.make_aware(datetime.combine(since, time.min))
+            history = history.filter(submission__in=RequestSubmissionStatusHistory.objects.filter(date__gte=since_date).values("submission_id"))
+
+        intervals = []
+        rows = history.values_list("pk", "submission_id", "submission__college_id", "date", "previous_date", "previous_usertype").order_by()
+        for pk, submission_id, college_id, date, previous_date, previous_usertype in rows.iterator(chunk_size=2000):
+            if previous_date is None or (since_date and date < since_date):
+                continue
+            intervals.append(
+                cls(
+                    history_id=pk,
+                    submission_id=submission_id,
+                    college_id=college_id,
+                    usertype=previous_usertype,
+                    started_at=previous_date,
+                    ended_at=date,
+                    seconds=int((date - previous_date).total_seconds()),
+                )
+            )
+
+        with transaction.atomic():
+            (cls.objects.filter(ended_at__gte=since_date) if since_date else cls.objects.all()).delete()
+            cls.objects.bulk_create(intervals, batch_size=1000)
+        return len(intervals)
+
+
+class RequestAssignment(models.Model):
+    """
+    A request waiting on (or handled by) a usertype: opened by the status change that sends the request to the usertype
+    and closed by the next status change made by one of its users, who is stored as ``processed_by``.
+    """
+
+    submission = models.ForeignKey(RequestSubmission, on_delete=models.CASCADE, related_name="assignments")
+    usertype = models.CharField(max_length=30, choices=USERTYPE_CHOICES)
+    assigned_at = models.DateTimeField()
+    closed_at = models.DateTimeField(null=True, blank=True)
+    processed_by = models.ForeignKey("users.UserProfile", on_delete=models.SET_NULL, null=True, blank=True, related_name="processed_assignments")
+
+    class Meta:
+        ordering = ["-assigned_at"]
+        indexes = [
+            models.Index(fields=["usertype", "submission"]),
+            models.Index(fields=["processed_by", "submission"]),
+            # Inbox of a usertype, newest first
+            models.Index(fields=["usertype", "-assigned_at"], condition=Q(closed_at=None), name="request_assignment_open_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["submission", "usertype"], condition=Q(closed_at=None), name="request_assignment_one_open"),
+        ]
+
+    def __str__(self):
+        return f"{self.submission_id} - {self.usertype} - {'open' if self.closed_at is None else 'closed'}"
+
+    @classmethod
+    def visible_to(cls, usertype, user_profile):
+        """Ids of the requests ever assigned to ``usertype`` or processed by ``user_profile``, for an ``id__in`` filter."""
+        return cls.objects.filter(Q(usertype=usertype) | Q(processed_by=user_profile)).values("submission_id")
+
+    @classmethod
+    def record(cls, history, processed=True):
+        """
+        Apply one status history row: close the assignment of the acting usertype, unless ``history`` created the
+        request, and open one for ``history.next_usertype``.
+        """
+        if processed:
+            open_assignment = cls.objects.filter(submission_id=history.submission_id, usertype=history.usertype, closed_at=None)
+            if not open_assignment.update(closed_at=history.date, processed_by_id=history.user_id):
+                # The usertype acted on a request that was not waiting on it, keep a trace of who processed it
+                cls.objects.create(
+                    submission_id=history.submission_id,
+                    usertype=history.usertype,
+                    assigned_at=history.date,
+                    closed_at=history.date,
+                    processed_by_id=history.user_id,
+                )
+        if history.next_usertype:
+            cls.objects.get_or_create(submission_id=history.submission_id, usertype=history.next_usertype, closed_at=None, defaults={"assigned_at": history.date})
+
+    @classmethod
+    def record_many(cls, histories):
+        """
+        Apply ``(history, processed)`` pairs of status history rows of distinct requests like ``record()``, with one
+        update per acting usertype and batched inserts.
+        """
+        histories = list(histories)
+        closing = defaultdict(dict)
+        for history, processed in histories:
+            if processed:
+                closing[(history.usertype, history.user_id)][history.submission_id] = history.date
+
+        assignments = []
+        for (usertype, user_id), dates in closing.items():
+            open_assignments = cls.objects.filter(submission_id__in=dates, usertype=usertype, closed_at=None)
+            waiting = set(open_assignments.values_list("submission_id", flat=True))
+            closed_at = Case(*(When(submission_id=submission_id, then=Value(date)) for submission_id, date in dates.items()), output_field=models.DateTimeField())
+            open_assignments.update(closed_at=closed_at, processed_by_id=user_id)
+            assignments.extend(
+                cls(submission_id=submission_id, usertype=usertype, assigned_at=date, closed_at=date, processed_by_id=user_id)
+                for submission_id, date in dates.items()
+                if submission_id not in waiting
+            )
+
+        opening = {(history.submission_id, history.next_usertype): history.date for history, _ in histories if history.next_usertype}
+        if opening:
+            already_open = set(
+                cls.objects.filter(submission_id__in={submission_id for submission_id, _ in opening}, closed_at=None).values_list("submission_id", "usertype")
+            )
+            assignments.extend(
+                cls(submission_id=submission_id, usertype=usertype, assigned_at=date)
+                for (submission_id, usertype), date in opening.items()
+                if (submission_id, usertype) not in already_open
+            )
+        cls.objects.bulk_create(assignments, batch_size=1000)
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute every assignment by replaying the status history of each request in order."""
+        assignments = []
+        rows = RequestSubmissionStatusHistory.objects.order_by("submission_id", "date", "pk").values_list("submission_id", "usertype", "next_usertype", "user_id", "date")
+        for submission_id, history_rows in groupby(rows.iterator(chunk_size=2000), key=lambda row: row[0]):
+            open_assignments = {}
+            for index, (_, usertype, next_usertype, user_id, date) in enumerate(history_rows):
+                if index:
+                    assignment = open_assignments.pop(usertype, None)
+                    if assignment is None:
+                        assignment = cls(submission_id=submission_id, usertype=usertype, assigned_at=date)
+                        assignments.append(assignment)
+                    assignment.closed_at, assignment.processed_by_id = date, user_id
+                if next_usertype and next_usertype not in open_assignments:
+                    open_assignments[next_usertype] = cls(submission_id=submission_id, usertype=next_usertype, assigned_at=date)
+                    assignments.append(open_assignments[next_usertype])
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(assignments, batch_size=1000)
+        return len(assignments)
+
 
 class Memo(BaseModel):
     title = models.CharField(max_length=180)
@@ -1,41 +1,55 @@
-from django_tables2 import columns, TemplateColumn
+from django.db.models import Case, F, Value, When
+from django.utils.html import format_html
+from django_tables2 import columns, Table, TemplateColumn
 from core.base import BaseTable
 from .models import Memo, RequestSubmission, RequestSubmissionType
 
+
+# Rendered once at import, the status column only picks one of them per row
+STATUS_BADGES = {
+    status: (label, format_html('<span class="badge {}">{}</span>', css_class, label))
+    for status, label, css_class in (
+        ("approved", "Approved", "bg-success"),
+        ("rejected", "Rejected", "bg-danger"),
+        ("re_assign", "Re Assigned", "bg-dark bg-gradient"),
+        ("processing", "Processing", "bg-primary text-white"),
+        ("pending", "Pending", "bg-warning text-white"),
+    )
+}
+
+
+def request_status_badge(usertype):
+    """``status_badge`` annotation of the requests listed in RequestSubmissionTable for a user of ``usertype``."""
+    shown = ["approved", "rejected", "re_assign"] if usertype == "College" else ["approved", "rejected", "re_assign", "processing"]
+    return Case(When(status__in=shown, then=F("status")), default=Value("pending"))
+
+
+def my_request_status_badge():
+    """``status_badge`` annotation of MyRequestSubmissionTable, needs the ``oe_assigned_to_creator`` annotation."""
+    return Case(
+        When(oe_assigned_to_creator=True, status__in=["approved", "rejected"], then=F("status")),
+        When(oe_assigned_to_creator=True, then=Value("processing")),
+        default=Value("pending"),
+    )
+
+
+class RequestStatusColumn(columns.Column):
+    """Badge of the ``status_badge`` annotation of the record, falling back to its status."""
+
+    def get_badge(self, record):
+        return STATUS_BADGES.get(getattr(record, "status_badge", record.status), STATUS_BADGES["pending"])
+
+    def render(self, record):
+        return self.get_badge(record)[1]
+
+    def value(self, record):
+        return self.get_badge(record)[0]
+
+
 class RequestSubmissionTable(BaseTable):
     created = columns.DateTimeColumn(verbose_name="Created At", format="d/m/Y")
     request_id = columns.Column(verbose_name="Request ID")
-    status = columns.TemplateColumn(
-        verbose_name="Status",
-        template_code="""
-            {% if record.status == "approved" %}
-                <span class="badge bg-success">Approved</span>
-            
-            {% elif record.status == "rejected" %}
-                <span class="badge bg-danger">Rejected</span>
-
-            {% elif record.status == "re_assign" %}
-                <span class="badge bg-dark bg-gradient">Re Assigned</span>
-            
-            {% elif request.user.usertype == "College" %}
-                <span class="badge bg-warning text-white">Pending</span>
-            
-            {% elif record.approved_or_rejected_for_current_user|default_if_none:False %}
-                {% if record.status == "approved" %}
-                    <span class="badge bg-success">Approved</span>
-                {% elif record.status == "rejected" %}
-                    <span class="badge bg-danger">Rejected</span>
-                {% endif %}
-            
-            {% elif record.status == "processing" or record.is_processing %}
-                <span class="badge bg-primary text-white">Processing</span>
-            
-            {% else %}
-                <span class="badge bg-warning text-white">Pending</span>
-            {% endif %}
-        """,
-        orderable=True,
-    )
+    status = RequestStatusColumn(verbose_name="Status")
 
     class Meta:
         model = RequestSubmission
@@ -46,23 +60,7 @@ class RequestSubmissionTable(BaseTable):
 class MyRequestSubmissionTable(BaseTable):
     created = columns.DateTimeColumn(verbose_name="Created At", format="d/m/Y")
     request_id = columns.Column(verbose_name="Request ID")
-    status = columns.TemplateColumn(
-        verbose_name="Status",
-        template_code="""
-            {% if record.oe_assigned_to_creator %}
-                {% if record.status == 'approved' %}
-                    <span class="badge bg-success">Approved</span>
-                {% elif record.status == 'rejected' %}
-                    <span class="badge bg-danger">Rejected</span>
-                {% else %}
-                    <span class="badge bg-primary text-white">Processing</span>
-                {% endif %}
-            {% else %}
-                <span class="badge bg-warning text-white">Pending</span>
-            {% endif %}
-        """,
-        orderable=True,
-    )
+    status = RequestStatusColumn(verbose_name="Status")
 
     class Meta:
         model = RequestSubmission
@@ -81,4 +79,24 @@ class MemoTable(BaseTable):
     class Meta:
         model = Memo
         fields = ("title",)
-        attrs = {"class": "table key-buttons border-bottom"}
\ No newline at end of file
+        attrs = {"class": "table key-buttons border-bottom"}
+
+
+class RequestStageDwellTable(Table):
+    """Dwell time statistics per stage and college, in hours, as produced by ``masters.analytics.stage_dwell_stats``."""
+
+    stage = columns.Column(verbose_name="Stage")
+    college = columns.Column(verbose_name="College")
+    count = columns.Column(verbose_name="Stages")
+    median = columns.Column(verbose_name="Median (hours)")
+    p90 = columns.Column(verbose_name="P90 (hours)")
+    p99 = columns.Column(verbose_name="P99 (hours)")
+    mean = columns.Column(verbose_name="Mean (hours)")
+
+    class Meta:
+        attrs = {"class": "table key-buttons border-bottom"}
+
+    def render_hours(self, value):
+        return round(value / 3600, 1)
+
+    render_median = render_p90 = render_p99 = render_mean = render_hours
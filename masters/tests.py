@@ -0,0 +1,326 @@
+import csv
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from contextlib import contextmanager
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db import connections
+from django.db import transaction
+from django.db.models import Count
+from django.db.models import QuerySet
+from django.test import SimpleTestCase
+from django.test import TestCase
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import User
+from core.models import DocumentSequence
+from core.models import Notification
+from core.paginators import KeysetPaginator
+from core.sequences import allocate_number
+from core.sequences import next_document_number
+from users.models import UserProfile
+
+from .models import RequestAssignment
+from .models import RequestSubmission
+from .models import RequestSubmissionStatusHistory
+from .models import RequestSubmissionType
+from .workflow import build_flow
+from .workflow import compile_workflow
+
+
+STAFF_USERTYPES = ("OE", "director", "CRO", "PRO", "CAO", "FO")
+REQUEST_FLOWS = (
+    ["College", "OE", "CRO", "director"],
+    ["College", "OE", "PRO", "CAO", "director"],
+    ["College", "OE", "FO", "director"],
+)
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Seeds colleges, staff of every flow usertype and a few hundred requests with status history and notifications.
+
+    Views are measured with ``assertQueryBudget``: the budgets are upper bounds that must not depend on the amount of
+    seeded rows, so an N+1 regression pushes the query count far over them.
+    """
+
+    request_count = 240
+    notification_count = 40
+    max_seconds = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(email="admin@example.com", password="password")
+        cls.profiles = {}
+        for usertype in STAFF_USERTYPES:
+            user = User.objects.create_user(email=f"{usertype.lower()}@example.com", password="password", usertype=usertype)
+            cls.profiles[usertype] = UserProfile.objects.create(user=user, first_name=usertype)
+        cls.colleges = []
+        for index in range(3):
+            user = User.objects.create_user(email=f"college{index}@example.com", password="password", usertype="College")
+            cls.colleges.append(UserProfile.objects.create(user=user, first_name=f"College {index}"))
+
+        request_type = RequestSubmissionType.objects.create(title="Fee Concession")
+        statuses = ("forwarded", "forwarded", "re_assign", "approved", "rejected")
+        for index in range(cls.request_count):
+            college = cls.colleges[index % len(cls.colleges)]
+            flow = REQUEST_FLOWS[index % len(REQUEST_FLOWS)]
+            submission = RequestSubmission.objects.create(
+                college=college,
+                created_by=college,
+                creator=college.user,
+                title=request_type,
+                description="Request",
+                usertype_flow=flow,
+                current_usertype=flow[1],
+                status=("pending", "processing", "approved", "rejected")[index % 4],
+            )
+            # Walk the request a different number of steps along its flow, so every stage holds some requests
+            for step, usertype in enumerate(flow[: index % len(flow) + 1]):
+                actor = college if usertype == "College" else cls.profiles[usertype]
+                next_usertype = flow[step + 1] if step + 1 < len(flow) else "College"
+                history = RequestSubmissionStatusHistory.objects.create(
+                    submission=submission,
+                    user=actor,
+                    usertype=usertype,
+                    next_usertype=next_usertype,
+                    status=statuses[(index + step) % len(statuses)] if step else "forwarded",
+                )
+                history.submitted_users.add(actor)
+
+        for user in [cls.superuser] + [profile.user for profile in cls.profiles.values()] + [college.user for college in cls.colleges]:
+            Notification.objects.bulk_create(
+                Notification(user=user, message=f"Notification {index}", url="https://example.com/") for index in range(cls.notification_count)
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    @property
+    def users(self):
+        """Superuser, every staff usertype and a college, i.e. one user per dashboard layout and request scope"""
+        return [self.superuser] + [profile.user for profile in self.profiles.values()] + [self.colleges[0].user]
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_seconds=None):
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        elapsed = time.perf_counter() - started
+        queries = "\n".join(query["sql"] for query in context.captured_queries)
+        self.assertLessEqual(len(context.captured_queries), max_queries, f"{len(context.captured_queries)} queries over a budget of {max_queries}:\n{queries}")
+        self.assertLess(elapsed, max_seconds or self.max_seconds, f"took {elapsed:.2f}s")
+
+
+class RequestSubmissionViewQueryBudgetTest(QueryBudgetTestCase):
+    def test_request_submission_list(self):
+        for user in self.users:
+            for params in ({}, {"assigned": "true"}, {"status": "approved"}):
+                with self.subTest(usertype=user.usertype or "superuser", params=params):
+                    self.client.force_login(user)
+                    with self.assertQueryBudget(12):
+                        response = self.client.get(reverse("masters:request_submission_list"), params)
+                    self.assertEqual(response.status_code, 200)
+
+    def test_request_submission_list_with_invalid_cursor(self):
+        self.client.force_login(self.superuser)
+        first_page = self.client.get(reverse("masters:request_submission_list"))
+        for values in (["not a date", 1], ["2026-01-01T00:00:00+00:00", "not a key"], [{"a": 1}, [1]]):
+            with self.subTest(values=values):
+                cursor = KeysetPaginator.encode_cursor(values, False, 51)
+                response = self.client.get(reverse("masters:request_submission_list"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 200)
+                # Starts over from the first page
+                self.assertEqual(list(response.context["table"].page.object_list.data), list(first_page.context["table"].page.object_list.data))
+
+    def test_request_submission_list_export(self):
+        self.client.force_login(self.superuser)
+        response = self.client.get(reverse("masters:request_submission_list"), {"_export": "csv"})
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(len(rows), RequestSubmission.objects.count() + 1)
+
+        # XLSX is not streamed, the whole workbook comes from tablib
+        response = self.client.get(reverse("masters:request_submission_list"), {"_export": "xlsx"})
+        self.assertFalse(response.streaming)
+        self.assertTrue(response.content.startswith(b"PK"))
+
+    def test_my_request_submission_list(self):
+        for user in self.users:
+            with self.subTest(usertype=user.usertype or "superuser"):
+                self.client.force_login(user)
+                with self.assertQueryBudget(11):
+                    response = self.client.get(reverse("masters:my_request_submission_list"))
+                self.assertEqual(response.status_code, 200)
+
+    def test_request_submission_detail(self):
+        submission = RequestSubmission.objects.annotate(steps=Count("status_history")).order_by("-steps", "pk").first()
+        for user in self.users:
+            with self.subTest(usertype=user.usertype or "superuser"):
+                self.client.force_login(user)
+                with self.assertQueryBudget(26):
+                    response = self.client.get(submission.get_absolute_url())
+                self.assertEqual(response.status_code, 200)
+
+
+class RequestBulkActionQueryBudgetTest(QueryBudgetTestCase):
+    def test_director_bulk_decision(self):
+        waiting = list(RequestSubmission.objects.filter(latest_next_usertype="director").values_list("pk", flat=True))
+        elsewhere = RequestSubmission.objects.exclude(latest_next_usertype="director").values_list("pk", flat=True).first()
+        self.client.force_login(self.profiles["director"].user)
+        with self.assertQueryBudget(32):
+            response = self.client.post(reverse("masters:request_submission_bulk_action"), {"ids": waiting + [elsewhere], "status": "approved"})
+        self.assertEqual(response.status_code, 200)
+
+        results = response.json()["results"]
+        self.assertEqual([result["id"] for result in results], waiting + [elsewhere])
+        self.assertTrue(all(result["ok"] and result["next_usertype"] == "OE" for result in results[:-1]))
+        self.assertFalse(results[-1]["ok"])
+        self.assertEqual(RequestSubmission.objects.filter(pk__in=waiting, latest_next_usertype="OE", latest_status="approved").count(), len(waiting))
+        self.assertEqual(RequestSubmission.objects.filter(pk__in=waiting, status="approved").count(), len(waiting))
+        self.assertNotEqual(RequestSubmission.objects.get(pk=elsewhere).status, "approved")
+        self.assertEqual(RequestAssignment.objects.filter(submission__in=waiting, usertype="director", processed_by=self.profiles["director"]).count(), len(waiting))
+
+    def test_bulk_decision_permissions(self):
+        self.client.force_login(self.profiles["CRO"].user)
+        response = self.client.post(reverse("masters:request_submission_bulk_action"), {"ids": [1], "status": "approved"})
+        self.assertEqual(response.status_code, 403)
+
+
+class WorkflowTest(SimpleTestCase):
+    flow = ["College", "OE", "CRO", "PRO", "director"]
+
+    def test_steps_along_the_flow(self):
+        workflow = compile_workflow(self.flow)
+        self.assertEqual(workflow.next_usertype("College"), "OE")
+        self.assertEqual(workflow.next_usertype("OE"), "CRO")
+        self.assertEqual(workflow.next_usertype("PRO"), "director")
+        self.assertIsNone(workflow.next_usertype("director"))
+        self.assertIsNone(workflow.next_usertype("FO"))
+        self.assertEqual(workflow.previous_usertype("CRO"), "OE")
+        self.assertIsNone(workflow.previous_usertype("College"))
+
+    def test_director_decisions_go_to_oe(self):
+        workflow = compile_workflow(self.flow)
+        for status in ("approved", "rejected", "re_assign"):
+            self.assertEqual(workflow.next_usertype("director", status), "OE")
+        self.assertEqual(workflow.next_usertype("director", reassign_to="OE"), "OE")
+        self.assertEqual(workflow.reassign_targets, ("College", "OE", "CRO", "PRO"))
+
+    def test_oe_returns_director_decisions_to_the_creator(self):
+        self.assertEqual(compile_workflow(self.flow, "director", "approved").next_usertype("OE"), "College")
+        self.assertEqual(compile_workflow(self.flow, "director", "re_assign").next_usertype("OE"), "CRO")
+        self.assertEqual(compile_workflow(self.flow, "CRO", "approved").next_usertype("OE"), "CRO")
+
+    def test_preview_and_pending(self):
+        workflow = compile_workflow(["College", "OE", "director", "FO"], acted={"College", "OE", "director"})
+        self.assertEqual(workflow.preview_next_usertype("FO"), "director")
+        self.assertEqual(workflow.preview_next_usertype("OE"), "director")
+        self.assertEqual(workflow.next_pending_usertype("College"), "FO")
+
+    def test_compiled_once_per_flow_and_state(self):
+        self.assertIs(compile_workflow(self.flow, "director", "approved"), compile_workflow(tuple(self.flow), "director", "approved"))
+
+    def test_build_flow(self):
+        self.assertEqual(build_flow(["College"], "OE", ["CRO", " PRO", "OE", "director", "CRO"]), ["College", "OE", "CRO", "PRO", "director"])
+        self.assertEqual(build_flow([], "College", []), ["College", "OE", "director"])
+
+
+class RequestIdSequenceTest(TransactionTestCase):
+    workers = 8
+    requests_per_worker = 10
+
+    def setUp(self):
+        user = User.objects.create_user(email="college@example.com", password="password", usertype="College")
+        self.college = UserProfile.objects.create(user=user, first_name="College")
+        self.request_type = RequestSubmissionType.objects.create(title="Fee Concession")
+
+    def create_request(self):
+        return RequestSubmission.objects.create(
+            college=self.college, created_by=self.college, creator=self.college.user, title=self.request_type, description="Request", usertype_flow=["College", "OE", "director"]
+        )
+
+    def test_parallel_creates_get_distinct_ids(self):
+        barrier = threading.Barrier(self.workers)
+
+        def create_requests():
+            try:
+                barrier.wait()
+                return [self.create_request().request_id for _ in range(self.requests_per_worker)]
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            request_ids = [request_id for worker in [executor.submit(create_requests) for _ in range(self.workers)] for request_id in worker.result()]
+
+        total = self.workers * self.requests_per_worker
+        self.assertEqual(sorted(request_ids), [f"REQ{number:04}" for number in range(1, total + 1)])
+        self.assertEqual(DocumentSequence.objects.get(prefix="REQ", year=0).last_number, total)
+
+    def test_allocation_waits_for_open_transaction(self):
+        allocate_number("REQ")
+        allocated, commit = threading.Event(), threading.Event()
+
+        def first():
+            try:
+                with transaction.atomic():
+                    number = allocate_number("REQ")
+                    allocated.set()
+                    commit.wait(5)
+                return number
+            finally:
+                connections.close_all()
+
+        def second():
+            try:
+                return allocate_number("REQ")
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first_number = executor.submit(first)
+            self.assertTrue(allocated.wait(5))
+            second_number = executor.submit(second)
+            # The second allocation waits on the row held by the open transaction
+            with self.assertRaises(FuturesTimeoutError):
+                second_number.result(timeout=0.5)
+            commit.set()
+            self.assertEqual((first_number.result(), second_number.result()), (2, 3))
+
+    def test_sequence_created_concurrently(self):
+        update = QuerySet.update
+        calls = []
+
+        def update_after_concurrent_create(queryset, **kwargs):
+            if queryset.model is DocumentSequence and not calls:
+                calls.append(kwargs)
+                # Another caller creates the sequence between this caller's UPDATE and its INSERT
+                DocumentSequence.objects.bulk_create([DocumentSequence(prefix="REQ", year=0, last_number=5)])
+                return 0
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=update_after_concurrent_create):
+            self.assertEqual(allocate_number("REQ"), 6)
+        self.assertEqual(DocumentSequence.objects.get(prefix="REQ", year=0).last_number, 6)
+        self.assertEqual(self.create_request().request_id, "REQ0007")
+
+    def test_numbers_past_four_digits(self):
+        DocumentSequence.objects.create(prefix="REQ", year=0, last_number=9999)
+        self.assertEqual(self.create_request().request_id, "REQ10000")
+        self.assertEqual(self.create_request().request_id, "REQ10001")
+
+    def test_yearly_sequence(self):
+        from datetime import date
+
+        settings = {"receipt": {"prefix": "RCPT", "start_count": 5, "yearly": True}}
+        with mock.patch("core.sequences.get_default_document_settings", return_value=settings):
+            self.assertEqual(next_document_number("receipt", date(2025, 12, 31)), "RCPT2025-0005")
+            self.assertEqual(next_document_number("receipt", date(2025, 6, 1)), "RCPT2025-0006")
+            self.assertEqual(next_document_number("receipt", date(2026, 1, 1)), "RCPT2026-0005")
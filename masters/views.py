@@ -5,8 +5,9 @@ from django import forms
 from weasyprint import HTML, CSS
 from django.templatetags.static import static
 from django.contrib.auth import get_user_model
-from .models import Memo, RequestSubmission, RequestSubmissionStatusHistory, RequestSubmissionType
-from .forms import RequestStatusUpdateForm, RequestSubmissionTypeForm
+from .models import Memo, RequestAssignment, RequestSubmission, RequestSubmissionStatusHistory, RequestSubmissionType
+from .forms import RequestBulkActionForm, RequestStatusUpdateForm, RequestSubmissionTypeForm
+from .workflow import apply_bulk_decision, build_flow
 from django.urls import reverse_lazy
 from django.shortcuts import redirect
 from core import mixins
@@ -22,7 +23,7 @@ from core.pdfview import PDFView
 from django.utils import timezone
 from django.http import HttpResponse
 from weasyprint import HTML
-from core.models import Notification
+from core.notifications import MEMO_KIND, notify
 from users.models import UserProfile
 from django.forms import ModelChoiceField, ModelMultipleChoiceField
 from django.db.models import ForeignKey, OneToOneField, ManyToManyField
@@ -35,6 +36,7 @@ from django_filters import FilterSet, CharFilter, ChoiceFilter
 class RequestSubmissionListView(mixins.HybridListView):
     model = RequestSubmission
     table_class = tables.RequestSubmissionTable
+    keyset_pagination = True
     filterset_fields = {"title": ["exact"], "college": ["exact"], "status":['exact']}
     permissions = ()
 
@@ -54,13 +56,7 @@ class RequestSubmissionListView(mixins.HybridListView):
         assigned_only = self.request.GET.get('assigned', '').lower() == 'true'
 
         if assigned_only:
-            latest_status_subquery = RequestSubmissionStatusHistory.objects.filter(
-                submission=OuterRef('pk')
-            ).order_by('-date')
-
-            qs = qs.annotate(
-                latest_next_usertype=Subquery(latest_status_subquery.values('next_usertype')[:1])
-            ).filter(
+            qs = qs.filter(
                 latest_next_usertype=usertype,
                 is_active=True
             )
@@ -82,9 +78,8 @@ class RequestSubmissionListView(mixins.HybridListView):
                 qs = qs.filter(status=status)
         else:
             qs = qs.filter(
-                Q(status_history__next_usertype=usertype) |
-                Q(status_history__submitted_users=user_profile)
-            ).distinct().exclude(creator=user_profile.user)
+                id__in=RequestAssignment.visible_to(usertype, user_profile)
+            ).exclude(creator=user_profile.user)
 
             status = self.request.GET.get("status", "").lower()
             if status in ["approved", "rejected"]:
@@ -95,12 +90,15 @@ class RequestSubmissionListView(mixins.HybridListView):
                 qs = qs.filter(
                     id__in=oe_to_college_ids,
                     status=status
-                ).distinct()
+                )
             elif status == "processing":
                 qs = qs.filter(status="processing")
 
         return qs
 
+    def get_table_data(self):
+        return super().get_table_data().annotate(status_badge=tables.request_status_badge(self.request.user.usertype))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update({
@@ -115,6 +113,7 @@ class RequestSubmissionListView(mixins.HybridListView):
 class SharedRequestsListView(mixins.HybridListView):
     model = RequestSubmission
     table_class = tables.RequestSubmissionTable
+    keyset_pagination = True
     filterset_fields = {"title": ["exact"], "college": ["exact"], "status": ['exact']}
     permissions = ()
 
@@ -126,6 +125,9 @@ class SharedRequestsListView(mixins.HybridListView):
             request_shared_usertype__user=user,
         ).distinct()
 
+    def get_table_data(self):
+        return super().get_table_data().annotate(status_badge=tables.request_status_badge(self.request.user.usertype))
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context.update({
@@ -140,6 +142,7 @@ class SharedRequestsListView(mixins.HybridListView):
 class MyRequestSubmissionListView(mixins.HybridListView):
     model = RequestSubmission
     table_class = tables.MyRequestSubmissionTable
+    keyset_pagination = True
     filterset_fields = {"title": ["exact"], "college": ["exact"], "status": ["exact"]}
     permissions = ()
 
@@ -154,14 +157,8 @@ class MyRequestSubmissionListView(mixins.HybridListView):
 
         qs = RequestSubmission.objects.filter(created_by=user_profile)
 
-        latest_next_usertype = RequestSubmissionStatusHistory.objects.filter(
-            submission=OuterRef('pk')
-        ).order_by('-date').values('next_usertype')[:1]
-
-        qs = qs.annotate(latest_status=Subquery(latest_next_usertype))
-
         if usertype == "director":
-            assigned_back_filter = Q(latest_status="director")
+            assigned_back_filter = Q(latest_next_usertype="director")
         else:
             latest_usertype_from_oe = RequestSubmissionStatusHistory.objects.filter(
                 submission=OuterRef('pk'),
@@ -169,8 +166,8 @@ class MyRequestSubmissionListView(mixins.HybridListView):
             ).order_by('-date').values('next_usertype')[:1]
 
             assigned_back_filter = Q(
-                latest_status=Subquery(latest_usertype_from_oe)
-            ) & Q(latest_status=usertype)
+                latest_next_usertype=Subquery(latest_usertype_from_oe)
+            ) & Q(latest_next_usertype=usertype)
 
         qs = qs.filter(
             Q(created_by=user_profile) | assigned_back_filter
@@ -192,12 +189,12 @@ class MyRequestSubmissionListView(mixins.HybridListView):
                 )
             ),
             submitted_by_me=Exists(
-                RequestSubmissionStatusHistory.objects.filter(
+                RequestAssignment.objects.filter(
                     submission=OuterRef("pk"),
-                    submitted_users=user_profile
+                    processed_by=user_profile
                 )
             )
-        )
+        ).annotate(status_badge=tables.my_request_status_badge())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -343,13 +340,8 @@ class RequestSubmissionCreateView(mixins.HybridCreateView):
                 remark=f"{user_profile.user.usertype} created the request."
             )
 
-            next_profiles = UserProfile.objects.filter(user__usertype=form.instance.current_usertype)
-            for profile in next_profiles:
-                Notification.objects.create(
-                    user=profile.user,
-                    message=f"New request assigned: {form.instance.title}",
-                    url=form.instance.get_absolute_url(),
-                )
+            next_profiles = UserProfile.objects.filter(user__usertype=form.instance.current_usertype).select_related("user")
+            notify([profile.user for profile in next_profiles], f"New request assigned: {form.instance.title}", form.instance.get_absolute_url(), request=self.request)
 
             return response
 
@@ -367,28 +359,16 @@ class RequestStatusUpdateView(mixins.HybridUpdateView):
     template_name = "masters/request_submission/request_submission_form.html"
 
     def get_next_usertype(self, submission, current_usertype):
-        flow = submission.usertype_flow or []
-        try:
-            current_index = flow.index(current_usertype)
-            if current_index > 0 and flow[current_index - 1] == "director":
-                return "director"
-            elif current_index + 1 < len(flow):
-                return flow[current_index + 1]
-            else:
-                return None
-        except ValueError:
-            return None
+        return submission.get_workflow().preview_next_usertype(current_usertype)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['usertype_choices'] = USERTYPE_CHOICES
         if self.request.user.usertype == 'director' and hasattr(self.object, 'usertype_flow'):
             usertype_labels = dict(USERTYPE_CHOICES)
-            flow = self.object.usertype_flow or []
             reassign_choices = [
                 (key, usertype_labels.get(key, key))
-                for key in flow
-                if key != 'director'
+                for key in self.object.get_workflow().reassign_targets
             ]
             context['reassign_usertype_choices'] = reassign_choices
         context['next_usertype'] = self.get_next_usertype(self.object, self.request.user.usertype)
@@ -407,30 +387,8 @@ class RequestStatusUpdateView(mixins.HybridUpdateView):
         submission = form.instance
         current_usertype = user_profile.user.usertype
 
-        flow_list = submission.usertype_flow or []
-
         if not submission.pk or current_usertype == "OE":
-            creator_usertype = flow_list[0] if flow_list else current_usertype
-            new_flow = [creator_usertype]
-
-            if "OE" not in new_flow:
-                new_flow.append("OE")
-
-            middle_usertypes = self.request.POST.getlist("user_flow") or []
-            middle_usertypes = [
-                ut.strip() for ut in middle_usertypes
-                if ut.strip() not in ["OE", "director", creator_usertype]
-            ]
-
-            for ut in middle_usertypes:
-                if ut not in new_flow:
-                    new_flow.append(ut)
-
-            if "director" not in new_flow:
-                new_flow.append("director")
-
-            submission.usertype_flow = new_flow
-            flow_list = new_flow  
+            submission.usertype_flow = build_flow(submission.usertype_flow or [], current_usertype, self.request.POST.getlist("user_flow"))
 
         shared_usertype = form.cleaned_data.get("request_shared_usertype")
         if shared_usertype:
@@ -440,33 +398,7 @@ class RequestStatusUpdateView(mixins.HybridUpdateView):
 
         status = form.cleaned_data.get("status")
         reassign_to = form.cleaned_data.get("reassign_usertype")
-        next_usertype = None
-
-        if current_usertype == "director":
-            if status in ["approved", "rejected", "re_assign"] or reassign_to == "OE":
-                next_usertype = "OE"
-            else:
-                try:
-                    idx = flow_list.index(current_usertype)
-                    next_usertype = flow_list[idx + 1] if idx + 1 < len(flow_list) else None
-                except ValueError:
-                    next_usertype = None
-        elif current_usertype == "OE":
-            last_history = submission.status_history.order_by("-created").first()
-            if last_history and last_history.usertype == "director" and last_history.status in ["approved", "rejected"]:
-                next_usertype = flow_list[0]  
-            else:
-                try:
-                    idx = flow_list.index(current_usertype)
-                    next_usertype = flow_list[idx + 1] if idx + 1 < len(flow_list) else None
-                except ValueError:
-                    next_usertype = None
-        else:
-            try:
-                idx = flow_list.index(current_usertype)
-                next_usertype = flow_list[idx + 1] if idx + 1 < len(flow_list) else None
-            except ValueError:
-                next_usertype = None
+        next_usertype = submission.get_workflow().next_usertype(current_usertype, status, reassign_to)
 
         submission.current_usertype = next_usertype
         submission.updated_by = user_profile
@@ -483,13 +415,8 @@ class RequestStatusUpdateView(mixins.HybridUpdateView):
         history_record.submitted_users.add(user_profile)
 
         if next_usertype:
-            next_profiles = UserProfile.objects.filter(user__usertype=next_usertype)
-            for profile in next_profiles:
-                Notification.objects.create(
-                    user=profile.user,
-                    message=f"Request assigned: {submission.title}",
-                    url=submission.get_absolute_url(),
-                )
+            next_profiles = UserProfile.objects.filter(user__usertype=next_usertype).select_related("user")
+            notify([profile.user for profile in next_profiles], f"Request assigned: {submission.title}", submission.get_absolute_url(), request=self.request)
 
         return redirect("core:home")
 
@@ -498,6 +425,29 @@ class RequestStatusUpdateView(mixins.HybridUpdateView):
         return super().form_invalid(form)
     
 
+class RequestBulkActionView(mixins.HybridView):
+    """Apply one decision to many requests waiting on the user, answering with a result per request."""
+
+    permissions = ("director", "OE")
+    http_method_names = ["post"]
+
+    def post(self, request, *args, **kwargs):
+        user_profile = get_object_or_404(UserProfile.objects.select_related("user"), user=request.user)
+        form = RequestBulkActionForm(request.POST, usertype=request.user.usertype)
+        if not form.is_valid():
+            return JsonResponse({"success": False, "errors": form.errors}, status=400)
+
+        results = apply_bulk_decision(
+            user_profile,
+            form.cleaned_data["ids"],
+            status=form.cleaned_data.get("status") or "forwarded",
+            remark=form.cleaned_data.get("remark") or None,
+            reassign_to=form.cleaned_data.get("reassign_usertype") or None,
+            request=request,
+        )
+        return JsonResponse({"success": True, "results": results})
+
+
 class RequestSubmissionDeleteView(mixins.HybridDeleteView):
     model = RequestSubmission
     permissions = ("director", "is_superuser")
@@ -605,6 +555,7 @@ class RequestSubmissionTypeListView(mixins.HybridListView):
     table_class = tables.RequestSubmissionTypeTable
     filterset_fields = {"title": ["exact"],}
     permissions = ("is_superuser", "director", "OE")
+    count_scope = "*"
 
     def get_queryset(self):
         return RequestSubmissionType.objects.filter(is_active=True)
@@ -737,18 +688,15 @@ class MemoCreateView(mixins.HybridCreateView):
 
             memo.college.set(selected_colleges)
 
-            for profile in memo.college.all():
-                user = profile.user
-                if user and user.is_active and user.email:
-                    notification = Notification(
-                        user=user,
-                        message=f"New memo published: {memo.title}",
-                        url=memo.get_absolute_url(),
-                        is_active=True
-                    )
-                    notification._request = self.request
-                    notification._memo_description = memo.description
-                    notification.save()
+            colleges = memo.college.filter(user__is_active=True).exclude(user__email="").exclude(user__email__isnull=True).select_related("user")
+            notify(
+                [profile.user for profile in colleges],
+                f"New memo published: {memo.title}",
+                memo.get_absolute_url(),
+                kind=MEMO_KIND,
+                extra={"title": memo.title, "description": memo.description},
+                request=self.request,
+            )
 
             return response
 
@@ -786,18 +734,8 @@ class MemoUpdateView(mixins.HybridUpdateView):
         selected_colleges = form.cleaned_data.get('college', [])
         memo.college.set(selected_colleges)
 
-        for profile in memo.college.all():
-            user = profile.user
-            if user and user.is_active and user.email:
-                notification = Notification(
-                    user=user,
-                    message=f"Memo updated: {memo.title}",
-                    url=memo.get_absolute_url(),
-                    is_active=True
-                )
-                notification._request = self.request
-                notification._memo_description = memo.description
-                notification.save()
+        colleges = memo.college.filter(user__is_active=True).exclude(user__email="").exclude(user__email__isnull=True).select_related("user")
+        notify([profile.user for profile in colleges], f"Memo updated: {memo.title}", memo.get_absolute_url(), request=self.request)
 
         return response
     
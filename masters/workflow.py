@@ -0,0 +1,174 @@
+from functools import lru_cache
+
+from django.db import transaction
+from django.utils import timezone
+from simple_history.utils import bulk_update_with_history
+
+from core.dashboard import bump_dashboard_version
+from core.dashboard import get_request_scopes
+from core.models import Notification
+from core.notifications import create_notifications
+from core.paginators import bump_count_version
+from core.search import index_on_commit
+from users.models import UserProfile
+
+from .models import RequestAssignment
+from .models import RequestSubmission
+from .models import RequestSubmissionStatusHistory
+
+
+# Director decisions that send a request back to OE
+DIRECTOR_DECISIONS = ("approved", "rejected", "re_assign")
+# Decisions each usertype can apply to many requests at once
+BULK_DECISIONS = {"director": DIRECTOR_DECISIONS, "OE": ("forwarded",)}
+BULK_ACTION_LIMIT = 500
+
+
+def build_flow(flow, usertype, middle_usertypes):
+    """Flow set by OE (or on creation): the creator, OE, the chosen middle usertypes and the director, each once."""
+    creator_usertype = flow[0] if flow else usertype
+    new_flow = [creator_usertype]
+    if "OE" not in new_flow:
+        new_flow.append("OE")
+    for middle_usertype in (middle_usertype.strip() for middle_usertype in middle_usertypes):
+        if middle_usertype not in ("OE", "director", creator_usertype) and middle_usertype not in new_flow:
+            new_flow.append(middle_usertype)
+    if "director" not in new_flow:
+        new_flow.append("director")
+    return new_flow
+
+
+class Workflow:
+    """
+    Transition table of a request: where its ``flow`` leads from every usertype, given the latest status history row.
+
+    The table is built once from the flow and that state, lookups are dictionary reads and never touch the database.
+    Director decisions and re-assignments to OE go to OE, OE sends director decisions back to the creator, everything
+    else moves one step along the flow.
+    """
+
+    def __init__(self, flow, latest_usertype=None, latest_status=None, acted=()):
+        self.flow = tuple(flow or ())
+        positions = {}
+        for index, usertype in enumerate(self.flow):
+            positions.setdefault(usertype, index)
+
+        self.steps = {usertype: self.flow[index + 1] if index + 1 < len(self.flow) else None for usertype, index in positions.items()}
+        self.previous = {usertype: self.flow[index - 1] if index else None for usertype, index in positions.items()}
+        # Next usertype after each one that has not acted on the request yet
+        self.pending = {usertype: next((step for step in self.flow[index + 1 :] if step not in acted), None) for usertype, index in positions.items()}
+        # Next usertype shown on the update form: a usertype right after the director hands back to the director
+        self.previews = {usertype: "director" if self.previous[usertype] == "director" else self.steps[usertype] for usertype in positions}
+        self.decisions = {"director": "OE"}
+        if latest_usertype == "director" and latest_status in ("approved", "rejected"):
+            self.decisions["OE"] = self.flow[0] if self.flow else None
+        self.reassign_targets = tuple(usertype for usertype in self.flow if usertype != "director")
+
+    def next_usertype(self, usertype, status=None, reassign_to=None):
+        """Usertype the request moves to when a user of ``usertype`` acts on it with ``status``."""
+        if usertype == "director" and not (status in DIRECTOR_DECISIONS or reassign_to == "OE"):
+            return self.steps.get(usertype)
+        return self.decisions.get(usertype, self.steps.get(usertype))
+
+    def previous_usertype(self, usertype):
+        return self.previous.get(usertype)
+
+    def preview_next_usertype(self, usertype):
+        return self.previews.get(usertype)
+
+    def next_pending_usertype(self, usertype):
+        """First usertype after ``usertype`` in the flow that has not acted yet, see ``acted``."""
+        return self.pending.get(usertype)
+
+
+@lru_cache(maxsize=1024)
+def _compile_workflow(flow, latest_usertype, latest_status, acted):
+    return Workflow(flow, latest_usertype, latest_status, acted)
+
+
+def compile_workflow(flow, latest_usertype=None, latest_status=None, acted=()):
+    """Shared ``Workflow`` of a flow and state, requests on the same flow and in the same state reuse one table."""
+    return _compile_workflow(tuple(flow or ()), latest_usertype, latest_status, frozenset(acted))
+
+
+def apply_bulk_decision(user_profile, submission_ids, status="forwarded", remark=None, reassign_to=None, request=None):
+    """
+    Apply one decision of ``user_profile`` to the requests ``submission_ids`` in a single transaction, following the
+    rules of the status update form. Requests that are not waiting on the user's usertype are skipped.
+
+    Returns one ``{"id", "ok", "error", ...}`` result per id, in order.
+    """
+    user = user_profile.user
+    usertype = user.usertype
+    results = {pk: {"id": pk, "ok": False, "error": "Request not found."} for pk in submission_ids}
+
+    with transaction.atomic():
+        submissions = list(
+            RequestSubmission.objects.select_for_update(of=("self",)).select_related("title", "latest_history").filter(pk__in=submission_ids, is_active=True)
+        )
+        # OE writes the request summary on its first pass, which only the update form can do
+        summarized = set()
+        if usertype == "OE":
+            summarized = set(RequestSubmissionStatusHistory.objects.filter(submission__in=submissions, usertype="OE").values_list("submission_id", flat=True))
+
+        now = timezone.now()
+        changed, histories = [], []
+        for submission in submissions:
+            result = results[submission.pk]
+            result["request_id"] = submission.request_id
+            if submission.latest_next_usertype != usertype:
+                result["error"] = f"Request is not waiting on {usertype}."
+                continue
+            if usertype == "OE" and submission.pk not in summarized:
+                result["error"] = "Request needs a summary, update it on its own page."
+                continue
+
+            if usertype == "OE":
+                submission.usertype_flow = build_flow(submission.usertype_flow or [], usertype, submission.usertype_flow or [])
+            next_usertype = submission.get_workflow().next_usertype(usertype, status, reassign_to)
+
+            if usertype == "director":
+                # The status update form saves the director's decision on the request itself
+                submission.status = status
+            submission.current_usertype = next_usertype
+            submission.updated_by = user_profile
+            submission.updated = now
+            changed.append(submission)
+            histories.append(
+                RequestSubmissionStatusHistory(submission=submission, user=user_profile, usertype=usertype, status=status, remark=remark, next_usertype=next_usertype or "")
+            )
+            result.update(ok=True, error=None, next_usertype=next_usertype)
+
+        if not changed:
+            return [results[pk] for pk in submission_ids]
+
+        bulk_update_with_history(changed, RequestSubmission, ["usertype_flow", "status", "current_usertype", "updated_by", "updated"], default_user=user)
+        histories = RequestSubmissionStatusHistory.create_many(histories, default_user=user)
+        SubmittedUser = RequestSubmissionStatusHistory.submitted_users.through
+        SubmittedUser.objects.bulk_create([SubmittedUser(requestsubmissionstatushistory_id=history.pk, userprofile_id=user_profile.pk) for history in histories])
+
+        recipients = {
+            next_usertype: [profile.user for profile in UserProfile.objects.filter(user__usertype=next_usertype).select_related("user")]
+            for next_usertype in {submission.current_usertype for submission in changed if submission.current_usertype}
+        }
+        # One INSERT for the notifications of every request, e-mailed once the decisions are stored
+        create_notifications(
+            [
+                Notification(user=user, message=f"Request assigned: {submission.title}", url=str(submission.get_absolute_url()))
+                for submission in changed
+                for user in recipients.get(submission.current_usertype, ())
+                if user is not None
+            ],
+            request=request,
+        )
+
+        # Stand in for the signals the bulk queries skip
+        scopes = set()
+        for submission in changed:
+            scopes.update(get_request_scopes(submission, usertype, submission.current_usertype))
+        bump_dashboard_version(*scopes)
+        bump_count_version(RequestSubmission, RequestSubmissionStatusHistory, SubmittedUser, RequestAssignment)
+        if remark:
+            index_on_commit(RequestSubmission.objects.filter(pk__in=[submission.pk for submission in changed]))
+
+    return [results[pk] for pk in submission_ids]
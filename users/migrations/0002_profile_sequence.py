@@ -0,0 +1,25 @@
+# Generated by Django 4.2 on 2026-10-18 08:52
+
+from django.db import migrations
+
+
+def seed_profile_sequence(apps, schema_editor):
+    """Continue the profile id sequence after the highest existing numeric profile id, inactive profiles included."""
+    DocumentSequence = apps.get_model("core", "DocumentSequence")
+    UserProfile = apps.get_model("users", "UserProfile")
+    profile_ids = UserProfile.objects.exclude(profile_id__isnull=True).values_list("profile_id", flat=True)
+    last_number = max((int(profile_id) for profile_id in profile_ids.iterator(chunk_size=2000) if profile_id.isdigit()), default=0)
+    if last_number:
+        DocumentSequence.objects.update_or_create(prefix="", year=0, defaults={"last_number": last_number})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_documentsequence'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_profile_sequence, migrations.RunPython.noop),
+    ]
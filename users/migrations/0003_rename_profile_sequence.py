@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-18 13:10
+
+from django.db import migrations
+
+
+def rename_sequence(old, new):
+    def rename(apps, schema_editor):
+        """Move the profile id counter from the ``old`` to the ``new`` sequence name, keeping the highest number."""
+        DocumentSequence = apps.get_model("core", "DocumentSequence")
+        sequence = DocumentSequence.objects.filter(prefix=old, year=0).first()
+        if sequence is None:
+            return
+        existing = DocumentSequence.objects.filter(prefix=new, year=0).first()
+        if existing is not None:
+            existing.last_number = max(existing.last_number, sequence.last_number)
+            existing.save(update_fields=["last_number"])
+            sequence.delete()
+        else:
+            sequence.prefix = new
+            sequence.save(update_fields=["prefix"])
+
+    return rename
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_profile_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_sequence("", "profile"), rename_sequence("profile", "")),
+    ]
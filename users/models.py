@@ -48,7 +48,7 @@ class UserProfile(BaseModel):
         return reverse_lazy("users:user_profile_update", kwargs={"pk": self.pk})
 
     def save(self, *args, **kwargs):
-        if not self.profile_id:
+        if self._state.adding and not self.profile_id:
             from .functions import generate_profile_id
             self.profile_id = generate_profile_id()
         if not self.pk and self.photo:
@@ -1,3 +1,61 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
-# Create your tests here.
+from accounts.models import User
+from core.models import DocumentSequence
+from core.models import SearchEntry
+from masters.models import RequestSubmission
+from masters.models import RequestSubmissionType
+
+from .models import UserProfile
+
+
+class ProfileIdTest(TestCase):
+    def test_ids_are_generated_on_create_only(self):
+        first = UserProfile.objects.create(first_name="First")
+        second = UserProfile.objects.create(first_name="Second")
+        self.assertEqual((first.profile_id, second.profile_id), ("0001", "0002"))
+
+        second.first_name = "Renamed"
+        second.save()
+        self.assertEqual(UserProfile.objects.get(pk=second.pk).profile_id, "0002")
+        self.assertEqual(DocumentSequence.objects.get(prefix="profile", year=0).last_number, 2)
+
+    def test_edit_form_does_not_allocate_ids(self):
+        user = User.objects.create_superuser(email="admin@example.com", password="password")
+        profile = UserProfile.objects.create(user=user, first_name="Admin")
+        self.client.force_login(user)
+        response = self.client.get(reverse("users:user_profile_update", kwargs={"pk": profile.pk}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(DocumentSequence.objects.get(prefix="profile", year=0).last_number, 1)
+
+
+class ProfileSearchIndexTest(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email="college@example.com", password="password", usertype="College")
+        # The search index is written once the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.college = UserProfile.objects.create(user=user, first_name="Old College")
+            self.submission = RequestSubmission.objects.create(
+                college=self.college, created_by=self.college, creator=user, title=RequestSubmissionType.objects.create(title="Fee Concession"), description="Request"
+            )
+
+    def request_title(self):
+        return SearchEntry.objects.get(object_id=self.submission.pk, content_type__model="requestsubmission").title
+
+    def test_requests_are_reindexed_when_the_college_is_renamed(self):
+        self.college.first_name = "New College"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.college.save()
+        self.assertIn("New College", self.request_title())
+
+    def test_requests_are_not_reindexed_for_other_changes(self):
+        for update_fields in (None, ["mobile"]):
+            with self.subTest(update_fields=update_fields):
+                self.college.mobile = "9999999999"
+                with CaptureQueriesContext(connection) as context, self.captureOnCommitCallbacks(execute=True):
+                    self.college.save(update_fields=update_fields)
+                self.assertFalse([query for query in context.captured_queries if "masters_requestsubmission" in query["sql"]])
+        self.assertIn("Old College", self.request_title())
@@ -3,11 +3,11 @@ from core import mixins
 from core.utils import build_url
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
+from accounts.models import User
 
 from . import forms
 from . import tables
 from .models import UserProfile
-from .functions import generate_profile_id
 
 
 class UserProfileListView(mixins.HybridListView):
@@ -15,7 +15,9 @@ class UserProfileListView(mixins.HybridListView):
     table_class = tables.UserProfileTable
     permissions = ("is_superuser", "director", "OE")
     filterset_fields = {}
-    search_fields = ("user__email", "employee_id", "first_name","last_name", "mobile", "whatsapp")
+    search_fields = ("user__email", "profile_id", "first_name", "last_name", "mobile", "whatsapp")
+    count_cache_models = (UserProfile, User)
+    count_scope = "*"
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -32,7 +34,9 @@ class CollegeUserProfileListView(mixins.HybridListView):
     table_class = tables.UserProfileTable
     permissions = ("is_superuser", "director", "OE")
     filterset_fields = {}
-    search_fields = ("user__email", "employee_id", "first_name","last_name", "mobile", "whatsapp")
+    search_fields = ("user__email", "profile_id", "first_name", "last_name", "mobile", "whatsapp")
+    count_cache_models = (UserProfile, User)
+    count_scope = "*"
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -102,11 +106,6 @@ class UserProfileUpdateView(mixins.HybridUpdateView):
     form_class = forms.UserProfileForm
     template_name = "users/user_profile_form.html"
 
-    def get_initial(self):
-        initial = super().get_initial()
-        initial['profile_id'] = generate_profile_id()
-        return initial
-
     def get_form_class(self):
         form_classes = {
             "personal": forms.UserProfileForm,